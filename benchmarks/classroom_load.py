@@ -0,0 +1,213 @@
+"""Simulate a classroom of players against the launcher's server.
+
+The server is started in a child process through the same path as the
+Start button (settings flush + ServerController), then N simulated players
+join over HTTP and, when a websocket URL is given, exchange messages over
+websockets. Everything runs on loopback.
+
+    python -m benchmarks.classroom_load --players 40 --duration 30
+    python -m benchmarks.classroom_load --ws-url ws://127.0.0.1:8000/ --output report.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+
+DEFAULT_PLAYERS = 30
+DEFAULT_DURATION = 20
+SAMPLE_INTERVAL = 1.0
+
+
+def _run_server(port, ready, stop):
+    # port is a shared value, updated with the port actually bound
+    from src.services.settings_store import app_settings, flush_all
+    from src.services.server_controller import ServerController
+
+    flush_all()
+    server = ServerController.from_settings(app_settings())
+    server.configured_port = port.value
+    server.start()
+    port.value = server.port
+    ready.set()
+    stop.wait()
+    server.stop()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class ProcessSampler:
+    """Samples CPU and RSS of a process from /proc"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.samples = []
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+
+    def _cpu_seconds(self):
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        # utime and stime are fields 14 and 15, counted after the command name
+        return (int(fields[11]) + int(fields[12])) / self._clock_ticks
+
+    def _rss_bytes(self):
+        with open(f'/proc/{self.pid}/statm') as f:
+            return int(f.read().split()[1]) * self._page_size
+
+    async def run(self, stop):
+        start = time.monotonic()
+        last_time, last_cpu = start, self._cpu_seconds()
+        while not stop.is_set():
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            now, cpu = time.monotonic(), self._cpu_seconds()
+            self.samples.append({
+                't': round(now - start, 2),
+                'cpu_percent': round(100 * (cpu - last_cpu) / (now - last_time), 1),
+                'rss_mb': round(self._rss_bytes() / 2**20, 1),
+            })
+            last_time, last_cpu = now, cpu
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, kind, latency):
+        self.latencies.setdefault(kind, []).append(latency)
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self, elapsed):
+        result = {}
+        for kind in sorted(set(self.latencies) | set(self.errors)):
+            values = self.latencies.get(kind, [])
+            result[kind] = {
+                'count': len(values),
+                'errors': self.errors.get(kind, 0),
+                'throughput_per_s': round(len(values) / elapsed, 1),
+                **{f'p{pct}_ms': round(percentile(values, pct) * 1000, 2) if values else None for pct in (50, 95, 99)},
+            }
+        return result
+
+
+async def http_get(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def player(args, stats, stop):
+    while not stop.is_set():
+        for path in args.paths:
+            start = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(http_get(args.host, args.port, path), args.timeout)
+            except (OSError, asyncio.TimeoutError):
+                stats.error('http')
+                continue
+            if status >= 400:
+                stats.error('http')
+            else:
+                stats.record('http', time.perf_counter() - start)
+        if args.ws_url:
+            await websocket_session(args, stats, stop)
+        await asyncio.sleep(args.think_time)
+
+
+async def websocket_session(args, stats, stop):
+    import websockets
+
+    try:
+        async with websockets.connect(args.ws_url, open_timeout=args.timeout) as ws:
+            for _ in range(args.ws_messages):
+                if stop.is_set():
+                    return
+                start = time.perf_counter()
+                await ws.send(args.ws_message)
+                await asyncio.wait_for(ws.recv(), args.timeout)
+                stats.record('websocket', time.perf_counter() - start)
+                await asyncio.sleep(args.think_time)
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException):
+        stats.error('websocket')
+
+
+async def run_load(args, server_pid):
+    stats = Stats()
+    stop = asyncio.Event()
+    sampler = ProcessSampler(server_pid)
+    sampler_task = asyncio.create_task(sampler.run(stop))
+    start = time.monotonic()
+    players = []
+    for _ in range(args.players):
+        players.append(asyncio.create_task(player(args, stats, stop)))
+        # Players do not all join in the same millisecond
+        await asyncio.sleep(args.ramp_up / args.players)
+    await asyncio.sleep(max(0, args.duration - (time.monotonic() - start)))
+    stop.set()
+    await asyncio.gather(*players, sampler_task, return_exceptions=True)
+    elapsed = time.monotonic() - start
+    return {
+        'players': args.players,
+        'duration_s': round(elapsed, 2),
+        'requests': stats.summary(elapsed),
+        'server_process': sampler.samples,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS)
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='seconds')
+    parser.add_argument('--ramp-up', type=float, default=2.0, help='seconds to spread the joins over')
+    parser.add_argument('--think-time', type=float, default=0.5, help='seconds between player actions')
+    parser.add_argument('--timeout', type=float, default=5.0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--paths', nargs='+', default=['/'], help='pages fetched by each player')
+    parser.add_argument('--ws-url', help='websocket URL, websocket traffic is skipped when omitted')
+    parser.add_argument('--ws-message', default='{"method": "ping"}')
+    parser.add_argument('--ws-messages', type=int, default=10, help='messages per websocket session')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    ready, stop = multiprocessing.Event(), multiprocessing.Event()
+    port = multiprocessing.Value('i', args.port)
+    server = multiprocessing.Process(target=_run_server, args=(port, ready, stop), daemon=True)
+    server.start()
+    if not ready.wait(30):
+        server.terminate()
+        raise SystemExit("Server did not start")
+    args.port = port.value
+    try:
+        report = asyncio.run(run_load(args, server.pid))
+    finally:
+        stop.set()
+        server.join(10)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -26,6 +26,9 @@ fi
 
 git submodule update --remote --merge
 source venv/bin/activate
+python -m src.utils.Glossary
+python -m src.services.static_assets
+python -m src.utils.Fonts
 buildozer android debug
 
 if command -v adb > /dev/null; then
@@ -1,80 +1,255 @@
-import pkg_resources
-import requests
+import argparse
+import json
+import os
+import re
+import threading
+import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from importlib import metadata
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from packaging.requirements import Requirement
+except ImportError:
+    Requirement = None
+
+PYPI_URL = "https://pypi.org/pypi"
+CACHE_FILE = os.path.join('.cache', 'pypi_cache.json')
+MAX_WORKERS = 16
+TIMEOUT = 10
+# Durée de validité de la "dernière version" connue d'un package non installé
+LATEST_TTL = 24 * 3600
+
+
+def normalize_name(name):
+    """Nom canonique d'un package (PEP 503)"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def clean_github_url(url):
+    return url.split('/tree/')[0].split('/issues/')[0].split('#')[0].rstrip('/')
+
 
-def get_package_info(package_name, processed=None, results=None, depth=0):
+def parse_requirement(line):
     """
-    Récupère récursivement les informations sur un package et ses dépendances.
-    
+    Extrait le nom d'une dépendance, ou None si elle ne s'applique pas ici.
+
+    Les dépendances optionnelles (extras) sont ignorées, comme le faisait
+    pkg_resources, et les marqueurs sont évalués si packaging est disponible.
+    """
+    if Requirement is not None:
+        req = Requirement(line)
+        if req.marker is not None and not req.marker.evaluate({'extra': ''}):
+            return None
+        return normalize_name(req.name)
+    name, _, marker = line.partition(';')
+    if 'extra' in marker:
+        return None
+    return normalize_name(re.match(r'[A-Za-z0-9._-]+', name.strip()).group(0))
+
+
+def installed_version(package_name):
+    try:
+        return metadata.version(package_name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def installed_requires(package_name):
+    try:
+        return metadata.requires(package_name) or []
+    except metadata.PackageNotFoundError:
+        return []
+
+
+def extract_info(package_data):
+    """
+    Extrait d'une réponse de l'API JSON de PyPI les informations utiles.
+
+    Returns:
+        dict: {'version', 'github_url', 'tarball_url', 'requires'}
+    """
+    info = package_data.get('info', {})
+
+    # Trouve l'URL GitHub
+    github_url = None
+    for url in (info.get('project_urls') or {}).values():
+        if url and 'github.com' in url.lower():
+            github_url = clean_github_url(url)
+            break
+
+    if not github_url:
+        home_page = info.get('home_page')
+        if home_page and 'github.com' in home_page.lower():
+            github_url = clean_github_url(home_page)
+
+    # Trouve l'URL du tarball, "urls" décrit les fichiers de la version demandée
+    version = info['version']
+    files = package_data.get('urls') or package_data.get('releases', {}).get(version, [])
+    tarball_url = next((f['url'] for f in files if f['filename'].endswith('.tar.gz')), None)
+
+    return {
+        'version': version,
+        'github_url': github_url,
+        'tarball_url': tarball_url,
+        'requires': info.get('requires_dist'),
+    }
+
+
+class PackageResolver:
+    """
+    Résout l'arbre de dépendances d'un package en parallèle.
+
+    Les requêtes PyPI partagent une session HTTP et sont faites par un pool
+    de threads. Les réponses sont gardées dans un cache JSON sur disque,
+    indexé par nom et version. En mode hors-ligne, les réponses sont lues
+    dans un miroir local contenant un fichier <nom>.json par package, au
+    format de l'API JSON de PyPI.
+    """
+
+    def __init__(self, cache_file=CACHE_FILE, mirror=None, workers=MAX_WORKERS, timeout=TIMEOUT):
+        self.cache_file = cache_file
+        self.mirror = mirror
+        self.workers = workers
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=workers, pool_maxsize=workers))
+        self._lock = threading.Lock()
+        self.cache = self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_cache(self):
+        os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_file}.tmp"
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.cache_file)
+
+    def _cached(self, package_name, version):
+        entry = self.cache.get(package_name, {})
+        if version is None:
+            # La dernière version n'est connue que pour une durée limitée
+            if time.time() - entry.get('checked', 0) > LATEST_TTL:
+                return None
+            version = entry.get('latest')
+        return entry.get('versions', {}).get(version)
+
+    def _store(self, package_name, info, latest):
+        with self._lock:
+            entry = self.cache.setdefault(package_name, {'versions': {}})
+            entry['versions'][info['version']] = info
+            if latest:
+                entry['latest'] = info['version']
+                entry['checked'] = time.time()
+
+    def _download(self, package_name, version):
+        if self.mirror is not None:
+            with open(os.path.join(self.mirror, f"{package_name}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        url = f"{PYPI_URL}/{package_name}/{version}/json" if version else f"{PYPI_URL}/{package_name}/json"
+        response = self.session.get(url, timeout=self.timeout)
+        if version and response.status_code == 404:
+            # Version installée absente de PyPI (build local), on prend la dernière
+            return self._download(package_name, None)
+        response.raise_for_status()
+        return response.json()
+
+    def fetch(self, package_name):
+        """
+        Récupère les informations d'un package, depuis le cache si possible.
+
+        La version installée est utilisée quand elle existe, sinon la
+        dernière version publiée.
+        """
+        version = installed_version(package_name)
+        info = None if self.mirror is not None else self._cached(package_name, version)
+        if info is None:
+            info = extract_info(self._download(package_name, version))
+            if self.mirror is None:
+                self._store(package_name, info, latest=version is None)
+        if info['requires'] is None:
+            # PyPI ne connaît pas toujours les dépendances, celles installées font foi
+            info = dict(info, requires=installed_requires(package_name))
+        return info
+
+    def _fetch_logged(self, package_name, depth):
+        print(f"{' ' * depth}Analyse de {package_name}...")
+        try:
+            return self.fetch(package_name)
+        except Exception as e:
+            print(f"{' ' * depth}Erreur avec {package_name}: {str(e)}")
+            return None
+
+    def resolve(self, package_name):
+        """
+        Récupère les informations sur un package et toutes ses dépendances.
+
+        Returns:
+            OrderedDict: Dictionnaire des résultats {package_name: (github_url, tarball_url)}
+        """
+        root = normalize_name(package_name)
+        infos = {}
+        dependencies = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(self._fetch_logged, root, 0): (root, 0)}
+            seen = {root}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, depth = pending.pop(future)
+                    infos[name] = future.result()
+                    dependencies[name] = []
+                    for line in (infos[name] or {}).get('requires') or []:
+                        try:
+                            dep_name = parse_requirement(line)
+                        except Exception as e:
+                            print(f"{' ' * depth}Erreur avec les dépendances de {name}: {str(e)}")
+                            continue
+                        if dep_name is None:
+                            continue
+                        dependencies[name].append(dep_name)
+                        if dep_name not in seen:
+                            seen.add(dep_name)
+                            pending[pool.submit(self._fetch_logged, dep_name, depth + 1)] = (dep_name, depth + 1)
+        self.save_cache()
+
+        # Même ordre que le parcours en profondeur séquentiel
+        results = OrderedDict()
+
+        def visit(name):
+            if name in results:
+                return
+            info = infos[name]
+            results[name] = (info['github_url'], info['tarball_url']) if info else (None, None)
+            for dep_name in dependencies[name]:
+                visit(dep_name)
+
+        visit(root)
+        return results
+
+
+def get_package_info(package_name, resolver=None):
+    """
+    Récupère les informations sur un package et ses dépendances.
+
     Args:
         package_name (str): Nom du package à analyser
-        processed (set): Ensemble des packages déjà traités
-        results (OrderedDict): Dictionnaire ordonné stockant les résultats
-        depth (int): Profondeur de récursion actuelle
-    
+        resolver (PackageResolver): Résolveur à utiliser, un nouveau par défaut
+
     Returns:
         OrderedDict: Dictionnaire des résultats {package_name: (github_url, tarball_url)}
     """
-    if processed is None:
-        processed = set()
-    if results is None:
-        results = OrderedDict()
-    
-    # Évite les doublons
-    if package_name in processed:
-        return results
-    
-    processed.add(package_name)
-    print(f"{' ' * depth}Analyse de {package_name}...")
-    
-    try:
-        # Requête PyPI
-        pypi_url = f"https://pypi.org/pypi/{package_name}/json"
-        response = requests.get(pypi_url)
-        package_data = response.json()
-        
-        # Trouve l'URL GitHub
-        github_url = None
-        project_urls = package_data.get('info', {}).get('project_urls', {})
-        
-        for url in project_urls.values():
-            if url and 'github.com' in url.lower():
-                github_url = url.split('/tree/')[0].split('/issues/')[0].split('#')[0].rstrip('/')
-                break
-        
-        if not github_url:
-            home_page = package_data.get('info', {}).get('home_page')
-            if home_page and 'github.com' in home_page.lower():
-                github_url = home_page.split('/tree/')[0].split('/issues/')[0].split('#')[0].rstrip('/')
-        
-        # Trouve l'URL du tarball
-        tarball_url = None
-        releases = package_data.get('releases', {})
-        latest_version = package_data['info']['version']
-        
-        if latest_version in releases:
-            for file_info in releases[latest_version]:
-                if file_info['filename'].endswith('.tar.gz'):
-                    tarball_url = file_info['url']
-                    break
-        
-        # Stocke les résultats
-        results[package_name] = (github_url, tarball_url)
-        
-        # Analyse récursive des dépendances
-        try:
-            package = pkg_resources.working_set.by_key[package_name]
-            for req in package.requires():
-                dep_name = req.project_name.lower()
-                get_package_info(dep_name, processed, results, depth + 1)
-        except Exception as e:
-            print(f"{' ' * depth}Erreur avec les dépendances de {package_name}: {str(e)}")
-            
-    except Exception as e:
-        print(f"{' ' * depth}Erreur avec {package_name}: {str(e)}")
-        results[package_name] = (None, None)
-    
-    return results
+    return (resolver or PackageResolver()).resolve(package_name)
 
 def write_results(results, base_name):
     """
@@ -95,20 +270,23 @@ def write_results(results, base_name):
         f.write(','.join(tarballs))
 
 def main():
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python script.py package_name")
-        sys.exit(1)
-    
-    package_name = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Liste un package et ses dépendances pour buildozer")
+    parser.add_argument('package_name')
+    parser.add_argument('--offline', metavar='MIRROR', help="lit les réponses PyPI dans ce dossier au lieu du réseau")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--cache', default=CACHE_FILE, help="fichier de cache des réponses PyPI")
+    args = parser.parse_args()
+
+    package_name = args.package_name
     print(f"Analyse de {package_name} et ses dépendances...")
-    
+
     # Obtient toutes les informations
-    results = get_package_info(package_name)
-    
+    resolver = PackageResolver(cache_file=args.cache, mirror=args.offline, workers=args.workers)
+    results = get_package_info(package_name, resolver)
+
     # Écrit les résultats
     write_results(results, package_name)
     print(f"Analyse terminée. Résultats écrits dans {package_name}_dependencies.txt et {package_name}_tarballs.txt")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
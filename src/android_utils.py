@@ -8,4 +8,11 @@ def request_android_permissions():
         Permission.ACCESS_NETWORK_STATE,
         Permission.WAKE_LOCK,
         Permission.REQUEST_IGNORE_BATTERY_OPTIMIZATIONS
-    ])
\ No newline at end of file
+    ])
+
+# Class generated by buildozer for the service declared as Kahiinserver
+SERVER_SERVICE = 'org.kahiin.kahiin.ServiceKahiinserver'
+
+def start_server_service():
+    PythonActivity = autoclass('org.kivy.android.PythonActivity')
+    autoclass(SERVER_SERVICE).start(PythonActivity.mActivity, '')
@@ -0,0 +1,60 @@
+import logging
+from kivy.core.window import Window
+from kivy.utils import platform
+from kivy.clock import Clock
+from kivymd.app import MDApp
+from kivy.uix.screenmanager import ScreenManager
+from src.screens.main_screen import MainScreen
+from src.utils.Settings import get_app_glossary
+from src.services import startup_profiler
+from src.services.signal_handler import setup_signal_handlers
+from src.services.settings_store import app_settings, flush_all
+from src.services.tracing import tracer
+
+import src.config
+glossary = get_app_glossary()
+if app_settings().get('profiling'):
+    tracer.enable()
+
+class MainApp(MDApp):
+    def __init__(self, **kwargs):
+        super(MainApp, self).__init__(**kwargs)
+        
+        # Prevent app from closing on back button
+        Window.bind(on_keyboard=self.on_key)
+
+    def on_key(self, window, key, *args):
+        if key == 27:  # ESC/Back button
+            return True
+        return False
+
+    def build(self):
+        with startup_profiler.phase('MainApp.build'):
+            sm = ScreenManager()
+            sm.add_widget(MainScreen(glossary=glossary))
+        return sm
+
+    def on_start(self):
+        # Report once the first frame has been drawn
+        Clock.schedule_once(lambda dt: startup_profiler.report())
+
+    def stop(self, *args):
+        logging.info("Stopping application...")
+        if self.root:
+            logging.info("Stopping Flask server")
+            self.root.get_screen('main_screen').stop_flask_server()
+        return super().stop(*args)
+
+    def on_stop(self):
+        flush_all()
+        tracer.disable(wait=True)
+        super().on_stop()
+
+def run():
+    setup_signal_handlers()
+    
+    if platform == 'android':
+        from src.android_utils import request_android_permissions
+        request_android_permissions()
+    
+    MainApp().run()
@@ -1,20 +1,17 @@
 from kivy.config import Config
-from kivy.core.text import LabelBase
-import logging
 import os
-import sys
+
+from src.services.logging_config import setup_logging
+from src.services.startup_profiler import phase
+from src.utils.Fonts import register_fonts
+from src.utils.Settings import get_app_glossary
 
 Config.set('input', 'mouse', 'mouse,multitouch_on_demand')
 
 # Set the current directory to the one containing this file
 # os.chdir(os.path.dirname(os.path.abspath(__file__)))
-LabelBase.register(name='MaterialIcons', fn_regular='src/MaterialDesignIcons.ttf')
-LabelBase.register(name='Bagnard', fn_regular='kahiin/web/static/font/Bagnard.otf')
+with phase('font registration'):
+    register_fonts(get_app_glossary())
 
 # Logging setup
-logging.basicConfig(level=logging.DEBUG, 
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('app_log.txt', mode='w')
-    ])
\ No newline at end of file
+setup_logging()
\ No newline at end of file
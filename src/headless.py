@@ -0,0 +1,77 @@
+"""Runs the quiz server without the Kivy UI, for Linux servers and Raspberry Pis.
+
+    python main.py --headless [--host HOST] [--port PORT] [--workers N]
+
+Only the settings, the logging config and the server controller are
+loaded. SIGINT and SIGTERM drain the server and exit, so it can run as a
+systemd service. With several workers the server runs in that many
+processes sharing the port (see src/services/worker_pool.py).
+"""
+import argparse
+import logging
+import sys
+import time
+
+from src.services.logging_config import setup_logging
+from src.services.settings_store import app_settings, flush_all
+from src.services.server_controller import ServerController
+from src.services.server_supervisor import ServerSupervisor
+from src.services.signal_handler import setup_signal_handlers
+from src.services.worker_pool import WorkerPool, supports_workers
+
+# Seconds between two checks that the server is still meant to run
+WATCH_INTERVAL = 1
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='main.py --headless', description=__doc__.splitlines()[0])
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--host', help='defaults to the serverHost setting')
+    parser.add_argument('--port', type=int, help='defaults to the serverPort setting')
+    parser.add_argument('--workers', type=int, help='server processes, defaults to the serverWorkers setting or 1')
+    return parser.parse_args(argv)
+
+
+def run(argv=None):
+    args = parse_args(argv)
+    setup_logging()
+    settings = app_settings()
+    server = ServerController.from_settings(settings)
+    if args.host:
+        server.host = args.host
+    if args.port:
+        server.configured_port = args.port
+    workers = args.workers or int(settings.get('serverWorkers', 1))
+    if workers > 1 and supports_workers():
+        run_workers(server.host, server.configured_port, workers)
+        return
+
+    def cleanup():
+        server.stop()
+        flush_all()
+
+    setup_signal_handlers(cleanup)
+    # Nobody to ask, a quiz interrupted by a crash or a restart goes on
+    server.start(resume=True)
+    logging.info(f"Headless server running on {server.host}:{server.port}")
+    # Restarts the server in-process if it dies or hangs
+    supervisor = ServerSupervisor(server)
+    supervisor.start()
+    while server.wanted:
+        time.sleep(WATCH_INTERVAL)
+
+
+def run_workers(host, port, workers):
+    pool = WorkerPool(host, port, workers)
+
+    def cleanup():
+        pool.stop()
+        flush_all()
+
+    setup_signal_handlers(cleanup)
+    pool.start()
+    logging.info(f"Headless server running on {host}:{pool.port} with {workers} workers")
+    if not pool.watch():
+        cleanup()
+        # Non-zero so that systemd restarts the whole pool
+        sys.exit(1)
@@ -6,9 +6,7 @@ Config.set('input', 'mouse', 'mouse,multitouch_on_demand')
 import os
 import threading
 import logging
-import json
 import hashlib
-import socket
 
 from kivy.core.window import Window
 from kivy.utils import platform, get_color_from_hex
@@ -16,61 +14,65 @@ from kivy.metrics import dp
 from kivy.animation import Animation
 from kivy.clock import Clock
 from kivy.uix.scrollview import ScrollView
+from kivy.uix.image import Image
 
 from kivymd.app import MDApp
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.boxlayout import MDBoxLayout
-from kivymd.uix.label import MDLabel
-from kivymd.uix.textfield import MDTextField
+from kivymd.uix.button import MDFlatButton
+from kivymd.uix.dialog import MDDialog
 from kivymd.toast import toast
 from kivymd.icon_definitions import md_icons
 from kivymd.uix.tab import MDTabs
-from kivymd.uix.card import MDCard
-from kivymd.uix.toolbar import MDTopAppBar
-from kivymd.uix.menu import MDDropdownMenu
 
-from kahiin.app import start_flask
+from src.services.network import NetworkMonitor
+from src.services.qr_cache import render_qr
+from src.services.server_controller import ServerController, DEFAULT_PORT
+from src.services.server_supervisor import ServerSupervisor
+from src.services.service_control import RemoteServerController
+from src.services.session_journal import SessionJournal
+from src.services.startup_profiler import phase
+from src.services.tracing import tracer
 from src.ui.Tab import Tab
-from src.ui.SafeButton import SafeButton
+from src.ui.Theme import (
+    COLORS, FONT_NAME, icon_markup, themed_button, themed_card, themed_label, themed_text_field, themed_toolbar
+)
+from src.ui.Translations import TranslationRegistry
 
-from src.utils.Settings import get_kahiin_settings
+from src.utils.Settings import get_app_glossary
+from src.services.settings_store import app_settings, kahiin_settings, flush_all
 if platform == 'android':
     from jnius import autoclass
     from android.runnable import run_on_ui_thread
 
-# Modern color palette with dark gray instead of purple
-COLORS = {
-    'primary': get_color_from_hex("#333333"),  # Dark gray instead of purple
-    'primary_dark': get_color_from_hex("#212121"),  # Very dark gray
-    'accent': get_color_from_hex("#5D5D5D"),  # Medium gray
-    'background': get_color_from_hex("#FFFFFF"),
-    'card': get_color_from_hex("#F5F5F5"),
-    'text': get_color_from_hex("#333333"),
-    'success': get_color_from_hex("#4CAF50"),
-    'warning': get_color_from_hex("#FFC107"),
-    'error': get_color_from_hex("#F44336"),
-    'info': get_color_from_hex("#2196F3"),
+# Seconds between two refreshes of the server metrics card
+METRICS_INTERVAL = 2
+# Seconds between two network address checks, on top of Android connectivity events
+NETWORK_REFRESH_INTERVAL = 30
+# Supervisor status: label color and glossary key
+HEALTH_STATUS = {
+    'stopped': ('#9E9E9E', "ServerStopped"),
+    'ok': ('#4CAF50', "ServerHealthy"),
+    'slow': ('#FFC107', "ServerSlow"),
+    'unresponsive': ('#F44336', "ServerUnresponsive"),
+    'crashed': ('#F44336', "ServerCrashed"),
 }
-    
-def get_local_ip():
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(('10.254.254.254', 1))
-        IP = s.getsockname()[0]
-    except Exception as e:
-        logging.error(f"IP retrieval error: {e}")
-        IP = '127.0.0.1'
-    finally:
-        s.close()
-    return IP
 
+LANGUAGES = {
+    'fr': {'icon': md_icons["baguette"], 'name': 'Français'},
+    'en': {'icon': md_icons["tea"], 'name': 'English'},
+    'es': {'icon': md_icons["weather-sunny"], 'name': 'Español'},
+    'it': {'icon': md_icons["pizza"], 'name': 'Italiano'},
+    'de': {'icon': md_icons["sausage"], 'name': 'Deutsch'}
+}
+    
 class MainScreen(MDScreen):
     def __init__(self, glossary, **kwargs):
         super(MainScreen, self).__init__(**kwargs)
         self.glossary = glossary
+        self.translations = TranslationRegistry(glossary)
         self.name = "main_screen"
         self.app = MDApp.get_running_app()
-        self.kahiin_settings_path = os.path.join('kahiin','settings.json')
         
         # Variables for language dropdown
         self.current_language = None
@@ -79,33 +81,61 @@ class MainScreen(MDScreen):
         # Set the background color of the screen
         self.md_bg_color = COLORS['background']
 
-        # Load current settings
-        with open(self.kahiin_settings_path, 'r') as f:
-            self.settings = json.load(f)
-            
-        # Load application settings
-        try:
-            with open('settings.json', 'r') as f:
-                self.app_settings = json.load(f)
-                self.current_language = self.app_settings.get('language', 'fr')
-        except:
-            self.current_language = 'fr'
+        # Settings are loaded once and served from memory
+        self.settings = kahiin_settings()
+        self.app_settings = app_settings()
+        self.current_language = self.app_settings.get('language', 'fr')
 
-        self.flask_thread = None
-        self.service = None
-        self.wakelock_acquired = False
-        self.wakelock = None
+        if platform == 'android':
+            # The server runs in its own foreground service process
+            from src.android_utils import start_server_service
+            self.server = RemoteServerController(start_server_service, int(self.app_settings.get('serverPort', DEFAULT_PORT)))
+            # Supervised inside the service, its restarts are noticed when polling it
+            self.server_health = self.server.health
+            self._restarts_seen = None
+        else:
+            self.server = ServerController.from_settings(self.app_settings)
+            supervisor = ServerSupervisor(self.server)
+            supervisor.subscribe(lambda health: Clock.schedule_once(
+                lambda dt: self._on_server_restarted(health['restarts'])))
+            supervisor.start()
+            self.server_health = supervisor.snapshot
+            self._restarts_seen = 0
+        # Locks are taken by the server service while players are active
+        self.wakelock_enabled = self.app_settings.get('wakelockPolicy', True)
+
+        # Local addresses are discovered off the UI thread and cached
+        self.network = NetworkMonitor(android=platform == 'android')
+        self.network.subscribe(lambda addresses: Clock.schedule_once(lambda dt: self.update_addresses()))
+
+        # Widgets of the settings tab, created on first display
+        self.btn_list = []
+        self.password_field = None
 
         # Initialize the interface
-        self._init_ui()
+        with phase('MainScreen._init_ui'):
+            self._init_ui()
+
+        # Edits from the web admin or by hand show up without re-reading the files
+        self.settings.subscribe(lambda changed: Clock.schedule_once(lambda dt: self.refresh_setting_buttons()))
+        if platform != 'android':
+            self.app_settings.subscribe(lambda changed: self.server.configure(self.app_settings))
+
+        # The server may still be running in the service from a previous launch
+        threading.Thread(target=self._sync_server_state, daemon=True).start()
+        self.network.refresh_async()
+        Clock.schedule_interval(lambda dt: self.network.refresh_async(), NETWORK_REFRESH_INTERVAL)
+        if platform == 'android':
+            self.listen_connectivity_changes()
     
+    @tracer.traced()
     def _init_ui(self):
         """Initialize the user interface"""
         # Create the main layout
         layout = MDBoxLayout(orientation='vertical')
         
         # Add a toolbar at the top
-        toolbar = MDTopAppBar(
+        toolbar = themed_toolbar(
             title="Kahiin App",
             elevation=0,
             md_bg_color=COLORS['primary'],
@@ -120,20 +150,18 @@ class MainScreen(MDScreen):
             text_color_active=get_color_from_hex("#FFFFFF"),
             indicator_color=COLORS['accent'],
             elevation=0,
-            tab_hint_x=0.5  # Each tab takes half of the width
+            tab_hint_x=0.5,  # Each tab takes half of the width
+            font_name=FONT_NAME,
         )
         
         # Main tab
-        main_tab = Tab(title=self.glossary["ServerTab"], icon="server")
+        main_tab = self.translations.bind(Tab(icon="server"), 'title', "ServerTab")
         main_content = MDBoxLayout(orientation='vertical', padding=dp(20), spacing=dp(15), size_hint_y=1)
         
         # Card for server info
-        server_card = MDCard(
-            orientation="vertical",
+        server_card = themed_card(
             padding=dp(16),
             spacing=dp(10),
-            elevation=0,
-            radius=dp(5),
             ripple_behavior=True,
             size_hint_y=1  # Takes all available space
         )
@@ -145,11 +173,10 @@ class MainScreen(MDScreen):
             padding=[dp(10), dp(30), dp(10), dp(30)],  # Large vertical padding
         )
 
-        ip_label = MDLabel(
-            text=f"{get_local_ip()}[color=#CCCCCC]:8080[/color]",
+        self.ip_label = themed_label(
+            text=f"{self.network.primary_ip}[color=#CCCCCC]:{self.server.port}[/color]",
             font_style='H3',
             size_hint_y=1,  # Takes all remaining space
-            font_name='Bagnard',
             halign='center',
             valign='middle',
             theme_text_color="Primary",
@@ -157,29 +184,29 @@ class MainScreen(MDScreen):
             markup=True,
         )
 
-        ip_box.add_widget(ip_label)
-        server_card.add_widget(ip_box)
+        ip_box.add_widget(self.ip_label)
 
-        # Fullscreen warning message with reduced size
-        warning_label = MDLabel(
-            text=f"[size={dp(20)}px][font=MaterialIcons]{md_icons['alert-rhombus']}[/font][/size] [size={dp(14)}px]" + self.glossary["KeepAppWake"] + "[/size]",
-            theme_text_color="Error", 
+        # QR code students scan to join, rendered once per address
+        self.qr_image = Image(size_hint_y=1, allow_stretch=True, keep_ratio=True, opacity=0)
+        self.qr_url = None
+        ip_box.add_widget(self.qr_image)
+
+        # Other addresses the server can be reached on, e.g. hotspot and Wi-Fi
+        self.addresses_label = themed_label(
+            text='',
+            font_style='Caption',
+            size_hint_y=None,
+            height=dp(20),
             halign='center',
-            markup=True, 
-            size_hint_y=None,  # Fixed height instead of proportion
-            height=dp(40),  # Reduced fixed height
-            font_name='Bagnard',
-            padding=(0, dp(5))  # Reduced padding
+            theme_text_color="Secondary",
         )
-        server_card.add_widget(warning_label)
+        ip_box.add_widget(self.addresses_label)
+        server_card.add_widget(ip_box)
 
         # Button Card for server controls
-        button_card = MDCard(
-            orientation="vertical",
+        button_card = themed_card(
             padding=[dp(16), dp(5), dp(16), dp(16)],  # Reduce padding at the top
             spacing=dp(10),
-            elevation=0,
-            radius=dp(5),
             size_hint_y=None,
             height=dp(165),  # Reduce height to account for removed button
             md_bg_color=get_color_from_hex("#F4F4F4"),
@@ -187,43 +214,98 @@ class MainScreen(MDScreen):
 
         # Start Server Button
         self.start_button = self.create_button(
-            text=f'{self.glossary["StartServer"]}',
+            text='',
             icon='server-network',
             on_press=self.on_start_button,
             md_bg_color=COLORS['success'],
-            font_name='Bagnard',
             height=dp(45)  # Reduce button height
         )
+        self.translations.bind(self.start_button, 'text', "StartServer")
         button_card.add_widget(self.start_button)
 
         # Wakelock Button
         self.wakelock_button = self.create_button(
-            text=self.glossary["EnableWakelock"],
+            text='',
             on_press=self.toggle_wakelock,
             md_bg_color=COLORS['info'],
-            font_name='Bagnard',
             height=dp(45)  # Consistent height
         )
+        self.translations.bind(self.wakelock_button, 'text', "DisableWakelock" if self.wakelock_enabled else "EnableWakelock")
         button_card.add_widget(self.wakelock_button)
 
         # Exit Button
         exit_button = self.create_button(
-            text=f'{self.glossary["ExitApp"]}',
+            text='',
             icon='exit-to-app',
             on_press=self.stop_app,
             md_bg_color=COLORS['error'],
-            font_name='Bagnard',
             height=dp(45)  # Consistent height
         )
+        self.translations.bind(exit_button, 'text', "ExitApp")
         button_card.add_widget(exit_button)
         
+        # Card for live server metrics, only shown while the server runs
+        self.metrics_card = themed_card(
+            padding=dp(10),
+            size_hint_y=None,
+            height=dp(90),
+            md_bg_color=get_color_from_hex("#F4F4F4"),
+            opacity=0,
+        )
+        self.health_label = themed_label(
+            text='',
+            font_style='Caption',
+            halign='center',
+            markup=True,
+            size_hint_y=None,
+            height=dp(20),
+        )
+        self.metrics_card.add_widget(self.health_label)
+        self.metrics_label = themed_label(
+            text='',
+            font_style='Caption',
+            halign='center',
+            theme_text_color="Secondary",
+        )
+        self.metrics_card.add_widget(self.metrics_label)
+        self.metrics_event = None
+        # Set while a poll of the server is in flight
+        self._polling = False
+
         main_content.add_widget(server_card)
+        main_content.add_widget(self.metrics_card)
         main_content.add_widget(button_card)
         main_tab.add_widget(main_content)
+        self.main_tab = main_tab
+        self.current_tab = main_tab
 
         # Settings tab
-        settings_tab = Tab(title=self.glossary["SettingsTab"], icon="cog")
+        settings_tab = self.translations.bind(Tab(icon="cog"), 'title', "SettingsTab")
         
+        # Its content is only built when the tab is first opened
+        self.settings_tab = settings_tab
+        self.settings_built = False
+        tabs.bind(on_tab_switch=self.on_tab_switch)
+
+        # Add tabs to layout
+        tabs.add_widget(main_tab)
+        tabs.add_widget(settings_tab)
+        layout.add_widget(tabs)
+
+        # Entrance animation
+        self.opacity = 0
+        self.add_widget(layout)
+        Clock.schedule_once(self.animate_screen, 0.1)
+    
+    def on_tab_switch(self, instance_tabs, instance_tab, instance_tab_label, tab_text):
+        self.current_tab = instance_tab
+        if instance_tab is self.settings_tab and not self.settings_built:
+            self._build_settings_tab()
+
+    def _build_settings_tab(self):
+        """Build the content of the settings tab"""
+        self.settings_built = True
+
         # Add a ScrollView to allow scrolling
         scroll_view = ScrollView(
             do_scroll_x=False,
@@ -245,121 +327,84 @@ class MainScreen(MDScreen):
         settings_content.bind(minimum_height=settings_content.setter('height'))
         
         # Card for language selection
-        lang_card = MDCard(
-            orientation="vertical",
+        lang_card = themed_card(
             padding=dp(16),
             spacing=dp(10),
-            elevation=0,
-            radius=dp(5),
             size_hint_y=None,
             height=dp(120),
             md_bg_color=get_color_from_hex("#F4F4F4"),
         )
         
         # Language title
-        lang_title = MDLabel(
-            text=self.glossary["LanguageTitle"],
+        lang_title = themed_label(
             font_style='H6',
             size_hint_y=None,
             height=dp(30),
-            font_name='Bagnard',
             theme_text_color="Secondary",
             padding=(0, dp(8))  # Add uniform vertical padding
         )
+        self.translations.bind(lang_title, 'text', "LanguageTitle")
         lang_card.add_widget(lang_title)
         
-        # Button for language dropdown
-        languages = {
-            'fr': {'icon': md_icons["baguette"], 'name': 'Français'},
-            'en': {'icon': md_icons["tea"], 'name': 'English'},
-            'es': {'icon': md_icons["weather-sunny"], 'name': 'Español'},
-            'it': {'icon': md_icons["pizza"], 'name': 'Italiano'},
-            'de': {'icon': md_icons["sausage"], 'name': 'Deutsch'}
-        }
-        
         # Button to display dropdown
         self.lang_dropdown_button = self.create_button(
-            text=f"[size={dp(20)}px][font=MaterialIcons]{languages[self.current_language]['icon']}[/font][/size] {languages[self.current_language]['name']}",
+            text=self._language_button_text(),
             on_press=self.show_language_menu,
             md_bg_color=COLORS['primary'],
-            font_name='Bagnard',
             height=dp(50),
         )
         
         lang_card.add_widget(self.lang_dropdown_button)
         
-        # Create menu items
-        menu_items = []
-        for lang_code, lang_info in languages.items():
-            menu_items.append({
-                "text": f"{lang_info['name']}",
-                "viewclass": "OneLineListItem",
-                "on_release": lambda x=lang_code: self.change_language(x),
-                "icon": lang_info['icon']
-            })
-            
-        # Create dropdown menu
-        self.language_menu = MDDropdownMenu(
-            caller=self.lang_dropdown_button,
-            items=menu_items,
-            width_mult=4,
-            max_height=dp(250),
-            background_color=COLORS['card'],
-        )
-        
         settings_content.add_widget(lang_card)
 
         # Card for accessibility settings
-        access_card = MDCard(
-            orientation="vertical",
+        access_card = themed_card(
             padding=dp(16),
             spacing=dp(10),
-            elevation=0,
-            radius=dp(5),
             size_hint_y=None,
             height=dp(220),
             md_bg_color=get_color_from_hex("#F4F4F4"),
         )
         
         # Accessibility settings title
-        access_label = MDLabel(
-            text=self.glossary['AccessibilitySettings'],
+        access_label = themed_label(
             font_style='H6',
             size_hint_y=None,
             height=dp(30),
-            font_name='Bagnard',
             theme_text_color="Secondary",
             padding=(0, dp(8))  # Add uniform vertical padding
         )
+        self.translations.bind(access_label, 'text', "AccessibilitySettings")
         access_card.add_widget(access_label)
 
         # Accessibility settings buttons
         access_box = MDBoxLayout(orientation='vertical', spacing=dp(10), adaptive_height=True)
         
         self.dyslexic_btn = self.create_button(
-            text=self.glossary['DyslexicMode'],
+            text='',
             on_press=lambda x: self.toggle_setting('dyslexicMode', self.dyslexic_btn),
             md_bg_color=self.get_button_color('dyslexicMode'),
-            font_name='Bagnard',
             height=dp(45),
         )
         
         self.endOnAllAnswered_btn = self.create_button(
-            text=self.glossary['EndOnAllAnswered'],
+            text='',
             on_press=lambda x: self.toggle_setting('endOnAllAnswered', self.endOnAllAnswered_btn),
             md_bg_color=self.get_button_color('endOnAllAnswered'),
-            font_name='Bagnard',
             height=dp(45),
         )
 
         self.randomOrder_btn = self.create_button(
-            text=self.glossary['RandomOrder'],
+            text='',
             on_press=lambda x: self.toggle_setting('randomOrder', self.randomOrder_btn),
             md_bg_color=self.get_button_color('randomOrder'),
-            font_name='Bagnard',
             height=dp(45),
         )
 
+        self.translations.bind(self.dyslexic_btn, 'text', "DyslexicMode")
+        self.translations.bind(self.endOnAllAnswered_btn, 'text', "EndOnAllAnswered")
+        self.translations.bind(self.randomOrder_btn, 'text', "RandomOrder")
         access_box.add_widget(self.dyslexic_btn)
         access_box.add_widget(self.endOnAllAnswered_btn)
         access_box.add_widget(self.randomOrder_btn)
@@ -367,234 +412,376 @@ class MainScreen(MDScreen):
         settings_content.add_widget(access_card)
 
         # Card for password
-        pwd_card = MDCard(
-            orientation="vertical",
+        pwd_card = themed_card(
             padding=[dp(16), dp(35), dp(16), dp(10)],  # Augment padding at the top
             spacing=dp(0),  # Remove spacing between elements
-            elevation=0,
-            radius=dp(5),
             size_hint_y=None,
             height=dp(160),
             md_bg_color=get_color_from_hex("#F4F4F4"),
         )
         
         # Password title
-        pwd_title = MDLabel(
-            text=self.glossary['ChangePassword'],
+        pwd_title = themed_label(
             font_style='H6',
             size_hint_y=None,
             height=dp(30),
-            font_name='Bagnard',
             theme_text_color="Secondary",
             padding=(0, 0)  # Remove padding from title
         )
+        self.translations.bind(pwd_title, 'text', "ChangePassword")
         pwd_card.add_widget(pwd_title)
         
         # Password section with validation button
         pwd_box = MDBoxLayout(orientation='vertical', spacing=dp(10), size_hint_y=None, height=dp(100))
         
-        self.password_field = MDTextField(
-            hint_text=self.glossary['ChangePassword'],
+        self.password_field = themed_text_field(
             password=True,
             size_hint_x=1,  # Take full width
-            font_name='Bagnard',
             mode="rectangle",
             line_color_normal=COLORS['primary'],
         )
         
         pwd_button = self.create_button(
-            text=self.glossary['Change'],
+            text='',
             on_press=lambda x: self.change_password(self.password_field.text),
             md_bg_color=COLORS['primary'],
-            font_name='Bagnard',
             height=dp(45),
         )
+        self.translations.bind(self.password_field, 'hint_text', "ChangePassword")
+        self.translations.bind(pwd_button, 'text', "Change")
         self.btn_list = [self.dyslexic_btn, self.endOnAllAnswered_btn, self.randomOrder_btn, pwd_button]
         pwd_box.add_widget(self.password_field)
         pwd_box.add_widget(pwd_button)
         pwd_card.add_widget(pwd_box)
         settings_content.add_widget(pwd_card)
 
+        # Card for diagnostics
+        diag_card = themed_card(
+            padding=dp(16),
+            spacing=dp(10),
+            size_hint_y=None,
+            height=dp(120),
+            md_bg_color=get_color_from_hex("#F4F4F4"),
+        )
+        diag_title = themed_label(
+            font_style='H6',
+            size_hint_y=None,
+            height=dp(30),
+            theme_text_color="Secondary",
+            padding=(0, dp(8))  # Add uniform vertical padding
+        )
+        self.translations.bind(diag_title, 'text', "Diagnostics")
+        diag_card.add_widget(diag_title)
+
+        self.profiling_btn = self.create_button(
+            text='',
+            on_press=lambda x: self.toggle_profiling(),
+            md_bg_color=self.get_profiling_color(),
+            height=dp(45),
+        )
+        self.translations.bind(self.profiling_btn, 'text', "ProfilingMode")
+        diag_card.add_widget(self.profiling_btn)
+        settings_content.add_widget(diag_card)
+        self.set_settings_enabled(not self.server.running)
+
         # Add content to ScrollView
         scroll_view.add_widget(settings_content)
-        settings_tab.add_widget(scroll_view)
+        self.settings_tab.add_widget(scroll_view)
 
-        # Add tabs to layout
-        tabs.add_widget(main_tab)
-        tabs.add_widget(settings_tab)
-        layout.add_widget(tabs)
+    def _create_language_menu(self):
+        # Create menu items
+        menu_items = []
+        for lang_code, lang_info in LANGUAGES.items():
+            menu_items.append({
+                "text": f"{lang_info['name']}",
+                "viewclass": "OneLineListItem",
+                "on_release": lambda x=lang_code: self.change_language(x),
+                "icon": lang_info['icon'],
+                "font_name": FONT_NAME,
+            })
+            
+        # Create dropdown menu
+        from kivymd.uix.menu import MDDropdownMenu
+        self.language_menu = MDDropdownMenu(
+            caller=self.lang_dropdown_button,
+            items=menu_items,
+            width_mult=4,
+            max_height=dp(250),
+            background_color=COLORS['card'],
+        )
 
-        # Entrance animation
-        self.opacity = 0
-        self.add_widget(layout)
-        Clock.schedule_once(self.animate_screen, 0.1)
-        
-        # Apply Bagnard font to all text widgets
-        Clock.schedule_once(lambda dt: self.apply_font_to_all_widgets(), 0.2)
-    
     def show_language_menu(self, instance):
-        # Ensure all menu items use Bagnard font
-        for item in self.language_menu.items:
-            item['font_name'] = 'Bagnard'
+        if self.language_menu is None:
+            self._create_language_menu()
         self.language_menu.open()
     
     def animate_screen(self, dt):
         anim = Animation(opacity=1, duration=0.5)
         anim.start(self)
 
-    def create_button(self, text, on_press, md_bg_color, icon=None, disabled=False, font_name='CustomFont', height=dp(50)):
-        button = SafeButton(
-            text=text,
-            on_press=on_press,
-            md_bg_color=md_bg_color,
-            size_hint_y=None,
-            height=height,
-            font_size=dp(16),
-            disabled=disabled,
-            font_name=font_name,
-            elevation=0
-        )
-        return button
-
-    def update_settings(self):
-        with open(os.path.join(os.path.dirname(__file__), '..', '..', 'settings.json'), 'r') as f:
-            self.app_settings = json.load(f)
-
-    def update_kahiin_settings(self):
-        # Load settings from file
-        with open(self.kahiin_settings_path, 'r') as f:
-            self.settings = json.load(f)
+    def create_button(self, text, on_press, md_bg_color, icon=None, disabled=False, height=dp(50)):
+        return themed_button(text, on_press, md_bg_color, disabled=disabled, height=height)
 
     def get_button_color(self, setting_name):
-        self.update_kahiin_settings()
         return (0.2, 0.8, 0.2, 1) if self.settings.get(setting_name, False) else (0.8, 0.2, 0.2, 1)
     
+    def refresh_setting_buttons(self):
+        if not self.settings_built:
+            return
+        self.dyslexic_btn.md_bg_color = self.get_button_color('dyslexicMode')
+        self.endOnAllAnswered_btn.md_bg_color = self.get_button_color('endOnAllAnswered')
+        self.randomOrder_btn.md_bg_color = self.get_button_color('randomOrder')
+
+    def get_profiling_color(self):
+        return (0.2, 0.8, 0.2, 1) if tracer.enabled else (0.8, 0.2, 0.2, 1)
+
+    def toggle_profiling(self):
+        enabled = not tracer.enabled
+        self.app_settings.set('profiling', enabled)
+        if enabled:
+            tracer.enable()
+        else:
+            tracer.disable()
+        self.profiling_btn.md_bg_color = self.get_profiling_color()
+        toast(self.glossary["Setting"] + " " + self.glossary["ProfilingMode"] + " " + (self.glossary["Enabled"] if enabled else self.glossary["Disabled"]))
+
     def get_language_color(self, lang_code):
-        self.update_settings()
         return (0.2, 0.8, 0.2, 1) if lang_code == self.app_settings.get('language') else (0.8, 0.2, 0.2, 1)
 
+    @tracer.traced()
     def change_language(self, lang_code):
+        self.language_menu.dismiss()
+
         # Save language in settings
-        with open('settings.json', 'r') as f:
-            settings = json.load(f)
-        old_lang = settings['language']
-        settings['language'] = lang_code
+        self.app_settings.set('language', lang_code)
         self.current_language = lang_code
-        with open('settings.json', 'w') as f:
-            json.dump(settings, f)
-        
-        # Load all glossary to be able to access the new language
-        with open('glossary.json', 'r') as f:
-            all_glossaries = json.load(f)
         
         # Update glossary with selected language
-        self.glossary = all_glossaries[lang_code]
-        
-        # Create message to display change
-        message = self.glossary["LanguageChanged"]
+        self.glossary = get_app_glossary(lang_code)
         
-        # Option 1: Recreate complete interface
-        # This approach is the most reliable but can be a bit heavy
-        self.clear_widgets()
-        self._init_ui()
-        
-        # Option 2: Update existing interface texts
-        # Lighter but potentially less reliable depending on interface complexity
-        # self._update_ui_texts()
+        # Only the registered texts need to change, the widget tree is kept
+        self.translations.set_glossary(self.glossary)
+        self.lang_dropdown_button.text = self._language_button_text()
         
         # Change notification
-        toast(message)
-
-    def _update_ui_texts(self):
-        """Update all interface texts with current language"""
-        # Access tabs
-        # Find Tab objects in hierarchy
-        for widget in self.walk():
-            if isinstance(widget, Tab):
-                if hasattr(widget, 'icon') and widget.icon:
-                    if "server" in widget.icon.lower():
-                        widget.title = self.glossary["ServerTab"]
-                    elif "cog" in widget.icon.lower():
-                        widget.title = self.glossary["SettingsTab"]
-        
-        # Main page texts - find widgets directly
-        for widget in self.walk():
-            if isinstance(widget, MDLabel):
-                # Update warning label
-                if widget.theme_text_color == "Error" and "[font=MaterialIcons]" in widget.text:
-                    widget.text = f"[size={dp(28)}px][font=MaterialIcons]{md_icons['alert-rhombus']}[/font][/size] [size={dp(18)}px]" + self.glossary["KeepAppWake"] + "[/size]"
-                # Update IP label
-                elif "IP" in widget.text:
-                    widget.text = f"IP {self.glossary['Local']}: {get_local_ip()}[color=#CCCCCC]:8080[/color]"
-                # Update section titles
-                elif widget.text == self.glossary.get("AccessibilitySettings") or "Accessibilité" in widget.text:
-                    widget.text = self.glossary["AccessibilitySettings"]
-                elif widget.text == self.glossary.get("LanguageTitle") or "Langue" in widget.text:
-                    widget.text = self.glossary["LanguageTitle"]
-                elif widget.text == self.glossary.get("AboutApp") or "À propos" in widget.text:
-                    widget.text = self.glossary["AboutApp"]
-                elif widget.text == self.glossary.get("ChangePassword") or "mot de passe" in widget.text.lower():
-                    widget.text = self.glossary["ChangePassword"]
-        
-        # Buttons
-        self.start_button.text = self.glossary["StartServer"]
-        if self.wakelock_acquired:
-            self.wakelock_button.text = self.glossary["DisableWakelock"]
-        else:
-            self.wakelock_button.text = self.glossary["EnableWakelock"]
-        
-        # Accessibility buttons
-        self.dyslexic_btn.text = self.glossary["DyslexicMode"]
-        self.endOnAllAnswered_btn.text = self.glossary["EndOnAllAnswered"]
-        self.randomOrder_btn.text = self.glossary["RandomOrder"]
-        
-        # Password field
-        if hasattr(self, 'password_field'):
-            self.password_field.hint_text = self.glossary["ChangePassword"]
-        
-        # Iterate through all buttons to find quit button and change button
-        for widget in self.walk():
-            if isinstance(widget, SafeButton):
-                if widget.text == self.glossary.get("ExitApp") or "quitt" in widget.text.lower():
-                    widget.text = self.glossary["ExitApp"]
-                elif widget.text == self.glossary.get("Change") or "chang" in widget.text.lower():
-                    widget.text = self.glossary["Change"]
+        toast(self.glossary["LanguageChanged"])
+
+    def _language_button_text(self):
+        language = LANGUAGES[self.current_language]
+        return f"{icon_markup(language['icon'], dp(20))} {language['name']}"
 
     def change_password(self, new_password):
         hashed_password = hashlib.sha256(new_password.encode()).hexdigest()
-        self.settings['adminPassword'] = hashed_password
-        self.update_settings()
+        self.settings.set('adminPassword', hashed_password)
         toast(self.glossary['PasswordChanged'])
 
-    def start_flask_server(self):
-        self.flask_thread = threading.Thread(target=start_flask, daemon=True)
-        self.flask_thread.start()      
+    def update_addresses(self):
+        port = self.server.port
+        self.ip_label.text = f"{self.network.primary_ip}[color=#CCCCCC]:{port}[/color]"
+        self.addresses_label.text = '   '.join(f"{name} {ip}:{port}" for name, ip in self.network.addresses[1:])
+        url = f"http://{self.network.primary_ip}:{port}/"
+        if url != self.qr_url:
+            self.qr_url = url
+            threading.Thread(target=self._render_qr, args=(url,), daemon=True).start()
+
+    def _render_qr(self, url):
+        try:
+            path = render_qr(url)
+        except Exception as e:
+            logging.error(f"QR code generation error: {e}")
+            return
+        Clock.schedule_once(lambda dt: self._show_qr(url, path))
+
+    def _show_qr(self, url, path):
+        # A newer address may have been rendered in the meantime
+        if url != self.qr_url:
+            return
+        from kivy.core.image import Image as CoreImage
+        texture = CoreImage(path).texture
+        texture.mag_filter = 'nearest'
+        self.qr_image.texture = texture
+        self.qr_image.opacity = 1
+
+    def listen_connectivity_changes(self):
+        from android.broadcast import BroadcastReceiver
+        self.connectivity_receiver = BroadcastReceiver(
+            lambda context, intent: self.network.refresh_async(),
+            actions=['android.net.conn.CONNECTIVITY_CHANGE', 'android.net.wifi.WIFI_AP_STATE_CHANGED'],
+        )
+        self.connectivity_receiver.start()
+
+    @tracer.traced()
+    def start_flask_server(self, resume=False):
+        self.server.start(resume=resume)
         logging.info("Flask server started successfully")
 
-    def create_android_service(self):
+    def _sync_server_state(self):
         if platform == 'android':
-            PythonService = autoclass('org.kivy.android.PythonService')
-            service = PythonService.mService
-            logging.info("Default Android service used.")
-            return service
-        
-    def on_start_button(self, *args):
-        self.start_flask_server()
+            # Cached by the remote controller, ask the service once
+            self.server.refresh()
+        if self.server.running:
+            Clock.schedule_once(lambda dt: self._on_server_started())
+        elif SessionJournal().has_session():
+            Clock.schedule_once(lambda dt: self.show_resume_dialog())
+
+    def show_resume_dialog(self):
+        """Offer to resume the quiz interrupted when the app was killed"""
+        def resume(*args):
+            dialog.dismiss()
+            # The server restores the journaled session when it starts
+            self.on_start_button(resume=True)
+
+        def discard(*args):
+            dialog.dismiss()
+            SessionJournal().clear()
+
+        dialog = MDDialog(
+            # Starting without an answer drops the session, the user has to choose
+            auto_dismiss=False,
+            title=self.glossary["InterruptedSession"],
+            text=self.glossary["ResumeSessionQuestion"],
+            buttons=[
+                MDFlatButton(text=self.glossary["Discard"], font_name=FONT_NAME, on_release=discard),
+                MDFlatButton(text=self.glossary["Resume"], font_name=FONT_NAME, on_release=resume),
+            ],
+        )
+        dialog.open()
+
+    @tracer.traced()
+    def on_start_button(self, *args, resume=False):
+        if self.server.running:
+            self.on_stop_button()
+            return
+        # The server reads its settings from disk, make sure they are up to date
+        flush_all()
+        # Starting the Android service takes a few seconds, keep it off the UI thread
+        self.start_button.disabled = True
+        threading.Thread(target=self._start_server_in_background, args=(resume,), daemon=True).start()
+
+    def _start_server_in_background(self, resume):
+        error = None
+        try:
+            self.start_flask_server(resume)
+        except Exception as e:
+            # Whatever failed, kahiin's import included, the button must come back
+            error = e
+        Clock.schedule_once(lambda dt: self._on_server_started(error))
+
+    def _on_server_started(self, error=None):
+        self.start_button.disabled = False
+        if error is not None:
+            logging.error(f"Server start error: {error}")
+            toast(self.glossary["ServerStartFailed"])
+            return
+        # The server may have moved to another port if the configured one was taken
+        self.update_addresses()
         if platform == 'android':
-            self.service = self.create_android_service()
             self.request_ignore_battery_optimizations()
-        self.start_button.disabled = True
-        self.start_button.md_bg_color = (0.5, 0.5, 0.5, 1)
-        for btn in self.btn_list:
-            btn.disabled = True
-            btn.md_color = (0.5, 0.5, 0.5, 1)
-        self.password_field.disabled = True
+        self.translations.bind(self.start_button, 'text', "StopServer")
+        self.start_button.md_bg_color = COLORS['error']
+        self.set_settings_enabled(False)
+        self.metrics_card.opacity = 1
+        if self.metrics_event is None:
+            self.metrics_event = Clock.schedule_interval(self.refresh_metrics, METRICS_INTERVAL)
         self.wakelock_button.disabled = False
         self.wakelock_button.md_color = (0.8, 0.2, 0.2, 1)
 
+    def on_stop_button(self):
+        # Draining connections can take a few seconds, keep it off the UI thread
+        self.start_button.disabled = True
+        threading.Thread(target=self._stop_server_in_background, daemon=True).start()
+
+    def _stop_server_in_background(self):
+        try:
+            stopped = self.server.stop()
+        except Exception as e:
+            # A service that does not answer in time, the server is left as it was
+            logging.error(f"Server stop error: {e}")
+            stopped = False
+        Clock.schedule_once(lambda dt: self._on_server_stopped(stopped))
+
+    def _on_server_restarted(self, restarts):
+        seen, self._restarts_seen = self._restarts_seen, restarts
+        if seen is None or restarts <= seen:
+            return
+        # Restarted by the supervisor, possibly on another port
+        self.update_addresses()
+        toast(self.glossary["ServerRestarted"])
+
+    def _on_server_stopped(self, stopped):
+        self.start_button.disabled = False
+        if not stopped:
+            return
+        self.translations.bind(self.start_button, 'text', "StartServer")
+        self.start_button.md_bg_color = COLORS['success']
+        self.set_settings_enabled(True)
+        if self.metrics_event is not None:
+            self.metrics_event.cancel()
+            self.metrics_event = None
+        self.metrics_card.opacity = 0
+
+    def refresh_metrics(self, dt):
+        # Nothing is sampled while the card is not on screen
+        if self.current_tab is not self.main_tab or self._polling:
+            return
+        self._polling = True
+        threading.Thread(target=self._poll_server, daemon=True).start()
+
+    def _poll_server(self):
+        # On Android these are socket round trips to a service that may be gone
+        if platform == 'android':
+            # Picks up the port of a server restarted by the service's supervisor
+            self.server.refresh()
+        try:
+            health = self.server_health()
+        except OSError:
+            # The service itself is gone
+            health = {'status': 'crashed', 'latency_ms': None, 'restarts': 0}
+        metrics = None
+        if self.server.metrics is not None:
+            try:
+                metrics = self.server.metrics.snapshot()
+            except OSError as e:
+                logging.warning(f"Unable to read the server metrics: {e}")
+        Clock.schedule_once(lambda dt: self._show_server_activity(health, metrics))
+
+    def _show_server_activity(self, health, metrics):
+        self._polling = False
+        self.show_health(health)
+        self._on_server_restarted(health['restarts'])
+        if not metrics:
+            return
+        p95 = '-' if metrics['p95_ms'] is None else f"{metrics['p95_ms']:.0f} ms"
+        self.metrics_label.text = (
+            f"{self.glossary['Players']}: {metrics['players']}   "
+            f"{self.glossary['RequestsPerSecond']}: {metrics['requests_per_s']:.1f}   "
+            f"{self.glossary['Websockets']}: {metrics['websockets']}\n"
+            f"{self.glossary['ResponseTime']}: {p95}   "
+            f"{self.glossary['CpuUsage']}: {metrics['cpu_percent']:.0f}%   "
+            f"{self.glossary['MemoryUsage']}: {metrics['rss_mb']:.0f} MB   "
+            f"{self.glossary['Threads']}: {metrics['threads']}"
+        )
+
+    def show_health(self, health):
+        color, key = HEALTH_STATUS[health['status']]
+        text = f"[color={color}]{self.glossary[key]}[/color]"
+        if health['latency_ms'] is not None:
+            text += f"   {health['latency_ms']:.0f} ms"
+        if health['restarts']:
+            text += f"   {self.glossary['Restarts']}: {health['restarts']}"
+        self.health_label.text = text
+
+    def set_settings_enabled(self, enabled):
+        # Settings are read by the server on start, they are locked while it runs
+        for btn in self.btn_list:
+            btn.disabled = not enabled
+            if not enabled:
+                btn.md_color = (0.5, 0.5, 0.5, 1)
+        if self.password_field is not None:
+            self.password_field.disabled = not enabled
+
     def stop_flask_server(self):
-        if self.flask_thread:
-            # Code to stop Flask server if necessary
+        if self.server.stop():
             logging.info("Flask server stopped")
 
     if platform == 'android':
@@ -617,60 +804,31 @@ class MainScreen(MDScreen):
             toast(self.glossary['DisableBatteryOptimizations'])
             logging.info("Battery optimization settings opened.")
 
+    def _send_wakelock(self, enabled):
+        try:
+            self.server.set_wakelock(enabled)
+        except OSError as e:
+            # The service also follows the wakelockPolicy setting
+            logging.warning(f"Unable to send the wakelock policy to the service: {e}")
+
     def stop_app(self, *args):
         self.app.stop()
 
+    @tracer.traced()
     def toggle_setting(self, setting_name, button):
-        settings = get_kahiin_settings()
-        settings[setting_name] = not settings[setting_name]
-        with open(self.kahiin_settings_path, 'w') as f:
-            json.dump(settings, f)
+        enabled = self.settings.toggle(setting_name)
         button.md_bg_color = self.get_button_color(setting_name)
-        toast(self.glossary["Setting"] + " " + setting_name + " " + (self.glossary["Enabled"] if self.settings[setting_name] else self.glossary["Disabled"]))
+        toast(self.glossary["Setting"] + " " + setting_name + " " + (self.glossary["Enabled"] if enabled else self.glossary["Disabled"]))
 
     def toggle_wakelock(self, *args):
-        if not self.wakelock_acquired:
-            self.acquire_wakelock()
-        else:
-            self.release_wakelock()
-
-    def acquire_wakelock(self):
-        if platform == 'android':
-            try:
-                PowerManager = autoclass('android.os.PowerManager')
-                Context = autoclass('android.content.Context')
-                activity = mActivity
-                pm = activity.getSystemService(Context.POWER_SERVICE)
-                self.wakelock = pm.newWakeLock(PowerManager.FULL_WAKE_LOCK, 'MyApp::WakelockTag')
-                self.wakelock.acquire()
-                self.wakelock_acquired = True
-                self.wakelock_button.text = self.glossary["DisableWakelock"]
-                toast(self.glossary["WakelockEnabled"])
-            except Exception as e:
-                print(f"Error when activating wakelock: {e}")
-        else:
+        """Enable or disable the automatic wakelock policy of the server service"""
+        if platform != 'android':
             toast(self.glossary["WakelockNotSupported"])
-
-    def release_wakelock(self):
-        if self.wakelock_acquired and self.wakelock is not None:
-            self.wakelock.release()
-            self.wakelock_acquired = False
-            self.wakelock_button.text = self.glossary["EnableWakelock"]
-            toast(self.glossary["WakelockDisabled"])
-
-    # Create a function to apply text style to all widgets
-    def apply_font_to_all_widgets(self):
-        """Apply Bagnard font to all text widgets"""
-        for widget in self.walk():
-            if hasattr(widget, 'font_name'):
-                widget.font_name = 'Bagnard'
-            # For specific widgets with title properties
-            if hasattr(widget, 'title') and isinstance(widget, MDTopAppBar):
-                for child in widget.walk():
-                    if hasattr(child, 'font_name'):
-                        child.font_name = 'Bagnard'
-            # For MDDropdownMenu items that will be created dynamically
-            if isinstance(widget, MDDropdownMenu):
-                for item in widget.items:
-                    if 'font_name' not in item:
-                        item['font_name'] = 'Bagnard'
\ No newline at end of file
+            return
+        self.wakelock_enabled = not self.wakelock_enabled
+        self.app_settings.set('wakelockPolicy', self.wakelock_enabled)
+        if self.server.running:
+            # A socket round trip to the service
+            threading.Thread(target=self._send_wakelock, args=(self.wakelock_enabled,), daemon=True).start()
+        self.translations.bind(self.wakelock_button, 'text', "DisableWakelock" if self.wakelock_enabled else "EnableWakelock")
+        toast(self.glossary["WakelockEnabled"] if self.wakelock_enabled else self.glossary["WakelockDisabled"])
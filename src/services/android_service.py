@@ -0,0 +1,82 @@
+"""Entry point of the Android foreground service hosting the quiz server.
+
+Declared in buildozer.spec, it runs in its own process so the server
+survives the activity being backgrounded or reclaimed. The UI drives it
+through the control channel in service_control.
+"""
+import os
+import sys
+
+# The service process starts with the service directory as script path
+sys.path.insert(0, os.environ.get('ANDROID_ARGUMENT', os.getcwd()))
+
+import logging
+
+from src.services.logging_config import setup_logging
+from src.services.settings_store import app_settings
+from src.services.power import WakelockPolicy
+from src.services.server_controller import ServerController
+from src.services.server_supervisor import ServerSupervisor
+from src.services.service_control import ControlServer
+from src.services.signal_handler import setup_signal_handlers
+from src.services.tracing import tracer, SPOOL_DIR
+
+# The UI process rotates app_log.txt on its own, each process needs its own file
+SERVICE_LOG_FILE = 'app_log.service.txt'
+# The server runs here, its request spans are traced apart from the UI's
+SERVICE_TRACE_FILE = 'kahiin_trace.service.json'
+SERVICE_SPOOL_DIR = SPOOL_DIR + '-service'
+
+
+def get_service():
+    from jnius import autoclass
+    return autoclass('org.kivy.android.PythonService').mService
+
+
+def set_profiling(enabled):
+    if enabled:
+        tracer.enable()
+    else:
+        tracer.disable()
+
+
+def stop_service(control, policy):
+    policy.stop()
+    # The process is about to end, the trace must be written before
+    tracer.disable(wait=True)
+    control.shutdown()
+    get_service().stopSelf()
+
+
+def main():
+    setup_logging(log_file=SERVICE_LOG_FILE)
+    settings = app_settings()
+    tracer.path, tracer.spool_dir = SERVICE_TRACE_FILE, SERVICE_SPOOL_DIR
+    set_profiling(settings.get('profiling'))
+    controller = ServerController.from_settings(settings)
+    policy = WakelockPolicy(controller, get_service(), enabled=settings.get('wakelockPolicy', True))
+    policy.start()
+    supervisor = ServerSupervisor(controller)
+    supervisor.start()
+
+    def on_settings_changed(changed):
+        controller.configure(settings)
+        if 'wakelockPolicy' in changed:
+            policy.set_enabled(changed['wakelockPolicy'])
+        if 'profiling' in changed:
+            set_profiling(changed['profiling'])
+
+    settings.subscribe(on_settings_changed)
+    # Snapshot the session before Android takes the process down
+    setup_signal_handlers(controller.stop)
+    control = ControlServer(
+        controller,
+        on_stop=lambda: stop_service(control, policy),
+        extra_commands={'wakelock': policy.set_enabled, 'health': supervisor.snapshot},
+    )
+    logging.info("Server service ready")
+    control.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Change notifications for a single file.
+
+Uses inotify through ctypes on Linux and Android (FileObserver is a thin
+wrapper around the same syscalls), and falls back to polling the file's
+stat elsewhere. The parent directory is watched, since atomic writers
+replace the file and its inode with it.
+"""
+import ctypes
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+
+# Quiet period after the last event before the callback runs
+DEBOUNCE = 0.2
+POLL_INTERVAL = 1.0
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _inotify():
+    # dlopen(NULL) finds libc on both glibc and bionic
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc if hasattr(libc, 'inotify_init1') else None
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    """Calls callback() from a background thread once path has stopped changing"""
+
+    def __init__(self, path, callback, debounce=DEBOUNCE, poll_interval=POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        target = self._run_polling
+        libc = _inotify()
+        if libc is not None and os.path.isdir(os.path.dirname(self.path)):
+            fd = libc.inotify_init1(IN_NONBLOCK)
+            if fd >= 0 and libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), WATCH_MASK) >= 0:
+                target = lambda: self._run_inotify(fd)
+            else:
+                logging.warning(f"inotify unavailable ({errno.errorcode.get(ctypes.get_errno())}), polling {self.path}")
+                if fd >= 0:
+                    os.close(fd)
+        self._thread = threading.Thread(target=target, name='kahiin-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _notify(self):
+        try:
+            self.callback()
+        except Exception:
+            logging.exception(f"Change callback for {self.path} failed")
+
+    def _run_inotify(self, fd):
+        name = os.path.basename(self.path).encode()
+        deadline = None
+        try:
+            while not self._stop.is_set():
+                timeout = self.poll_interval if deadline is None else max(0, deadline - time.monotonic())
+                readable, _, _ = select.select([fd], [], [], timeout)
+                if readable:
+                    try:
+                        buffer = os.read(fd, 4096)
+                    except BlockingIOError:
+                        continue
+                    offset = 0
+                    while offset < len(buffer):
+                        _, _, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+                        offset += _EVENT_HEADER.size
+                        if buffer[offset:offset + length].rstrip(b'\0') == name:
+                            deadline = time.monotonic() + self.debounce
+                        offset += length
+                elif deadline is not None and time.monotonic() >= deadline:
+                    deadline = None
+                    self._notify()
+        finally:
+            os.close(fd)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_ino, st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+    def _run_polling(self):
+        last = self._stat()
+        while not self._stop.wait(self.poll_interval):
+            current = self._stat()
+            if current == last:
+                continue
+            # Wait for the writer to be done before reading
+            while not self._stop.wait(self.debounce):
+                last, current = current, self._stat()
+                if current == last:
+                    break
+            self._notify()
@@ -0,0 +1,70 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+from src.services.settings_store import app_settings
+
+LOG_FILE = 'app_log.txt'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+MAX_LOG_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+_listener = None
+
+
+def default_log_level():
+    # Same check as kivy.utils.platform, without importing Kivy
+    return 'INFO' if 'ANDROID_ARGUMENT' in os.environ else 'DEBUG'
+
+
+def _resolve_level(level):
+    """Return the numeric level for level, or None if it is not a known one"""
+    if isinstance(level, int):
+        return level
+    # Given a known name, getLevelName() returns its number, on every Python 3
+    number = logging.getLevelName(str(level).upper())
+    return number if isinstance(number, int) else None
+
+
+def setup_logging(level=None, log_file=LOG_FILE):
+    """Route all logging through a queue so callers never block on I/O.
+
+    Records are written to stdout and to a size-rotated log file by a
+    background QueueListener. The level comes from the logLevel key of
+    settings.json, and defaults to INFO on Android and DEBUG elsewhere.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    requested = level or app_settings().get('logLevel') or default_log_level()
+    level = _resolve_level(requested)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT
+    )
+    # Each launch starts a fresh log, the previous one is kept as a backup
+    if os.path.exists(log_file) and os.path.getsize(log_file) > 0:
+        file_handler.doRollover()
+    for handler in (stream_handler, file_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level if level is not None else _resolve_level(default_log_level()))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    if level is None:
+        # Reported once the handlers exist, a typo in settings.json must not prevent the launch
+        logging.warning(f"Unknown log level {requested!r}, using {default_log_level()}")
+    return _listener
@@ -0,0 +1,112 @@
+import fcntl
+import logging
+import socket
+import struct
+import threading
+
+SIOCGIFADDR = 0x8915
+# Interfaces students can reach, best first: hotspot, Wi-Fi, then wired
+PREFERRED_INTERFACES = ('ap', 'swlan', 'softap', 'wlan', 'wl', 'eth', 'en')
+# Interfaces never reachable from the classroom network
+IGNORED_INTERFACES = ('lo', 'rmnet', 'ccmni', 'dummy', 'docker', 'veth', 'tun', 'p2p')
+
+
+def _interface_rank(name):
+    for rank, prefix in enumerate(PREFERRED_INTERFACES):
+        if name.startswith(prefix):
+            return rank
+    return len(PREFERRED_INTERFACES)
+
+
+def _linux_addresses():
+    addresses = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        for _, name in socket.if_nameindex():
+            try:
+                request = struct.pack('256s', name[:15].encode())
+                addresses.append((name, socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFADDR, request)[20:24])))
+            except OSError:
+                # Interface down or without IPv4 address
+                continue
+    return addresses
+
+
+def _android_addresses():
+    from jnius import autoclass
+    NetworkInterface = autoclass('java.net.NetworkInterface')
+    addresses = []
+    interfaces = NetworkInterface.getNetworkInterfaces()
+    while interfaces.hasMoreElements():
+        interface = interfaces.nextElement()
+        if not interface.isUp():
+            continue
+        inet_addresses = interface.getInetAddresses()
+        while inet_addresses.hasMoreElements():
+            host = inet_addresses.nextElement().getHostAddress()
+            # IPv6 addresses are skipped, players type or scan IPv4 addresses
+            if ':' not in host:
+                addresses.append((interface.getName(), host))
+    return addresses
+
+
+def probe_local_ip():
+    """Address of the interface holding the default route"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('10.254.254.254', 1))
+        return s.getsockname()[0]
+    except OSError as e:
+        logging.error(f"IP retrieval error: {e}")
+        return '127.0.0.1'
+    finally:
+        s.close()
+
+
+def discover_addresses(android=False):
+    """List the (interface, IPv4 address) pairs players can connect to, best first"""
+    try:
+        addresses = _android_addresses() if android else _linux_addresses()
+    except Exception as e:
+        logging.warning(f"Network interface enumeration failed: {e}")
+        addresses = []
+    addresses = [
+        (name, ip) for name, ip in addresses
+        if not name.startswith(IGNORED_INTERFACES) and not ip.startswith('127.')
+    ]
+    if not addresses:
+        return [('default', probe_local_ip())]
+    return sorted(addresses, key=lambda address: _interface_rank(address[0]))
+
+
+class NetworkMonitor:
+    """Caches the local addresses and refreshes them off the UI thread"""
+
+    def __init__(self, android=False):
+        self.android = android
+        self.addresses = []
+        self._listeners = []
+        self._refreshing = threading.Lock()
+
+    @property
+    def primary_ip(self):
+        return self.addresses[0][1] if self.addresses else '127.0.0.1'
+
+    def subscribe(self, callback):
+        """Call callback(addresses) from the refresh thread when they change"""
+        self._listeners.append(callback)
+
+    def refresh(self):
+        if not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            addresses = discover_addresses(self.android)
+        finally:
+            self._refreshing.release()
+        if addresses != self.addresses:
+            self.addresses = addresses
+            logging.info(f"Network addresses: {addresses}")
+            for callback in self._listeners:
+                callback(addresses)
+
+    def refresh_async(self):
+        threading.Thread(target=self.refresh, name='kahiin-network', daemon=True).start()
@@ -0,0 +1,87 @@
+import logging
+import threading
+import time
+
+# Seconds without any request before the locks are released
+IDLE_TIMEOUT = 300
+CHECK_INTERVAL = 10
+LOCK_TAG = 'Kahiin::Server'
+
+
+class WakelockPolicy:
+    """Holds a partial wakelock and a Wi-Fi lock while players are active.
+
+    The screen is free to turn off, only the CPU and the Wi-Fi radio are
+    kept awake, and only until the server has been idle for IDLE_TIMEOUT.
+    The locks are taken as soon as the server starts or a request comes in,
+    the periodic check only releases them.
+    """
+
+    def __init__(self, controller, context, enabled=True, idle_timeout=IDLE_TIMEOUT):
+        from jnius import autoclass
+        Context = autoclass('android.content.Context')
+        PowerManager = autoclass('android.os.PowerManager')
+        WifiManager = autoclass('android.net.wifi.WifiManager')
+
+        self.controller = controller
+        self.enabled = enabled
+        self.idle_timeout = idle_timeout
+        power_manager = context.getSystemService(Context.POWER_SERVICE)
+        wifi_manager = context.getApplicationContext().getSystemService(Context.WIFI_SERVICE)
+        self._wakelock = power_manager.newWakeLock(PowerManager.PARTIAL_WAKE_LOCK, LOCK_TAG)
+        self._wifi_lock = wifi_manager.createWifiLock(WifiManager.WIFI_MODE_FULL_HIGH_PERF, LOCK_TAG)
+        self._wakelock.setReferenceCounted(False)
+        self._wifi_lock.setReferenceCounted(False)
+        self._held = False
+        # The policy thread, the request threads and the control commands all update the locks
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        controller.activity_listeners.append(self._on_activity)
+
+    def start(self):
+        threading.Thread(target=self._run, name='kahiin-wakelock', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        with self._lock:
+            self._release()
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.update()
+
+    def _active(self):
+        metrics = self.controller.metrics
+        if not self.enabled or not self.controller.running or metrics is None:
+            return False
+        return time.monotonic() - metrics.last_activity < self.idle_timeout
+
+    def update(self):
+        with self._lock:
+            if self._active():
+                self._acquire()
+            else:
+                self._release()
+
+    def _on_activity(self):
+        # Called on every request, only does something when the locks are not held
+        if self.enabled and not self._held:
+            self.update()
+
+    def _run(self):
+        while not self._stop.wait(CHECK_INTERVAL):
+            self.update()
+
+    def _acquire(self):
+        if not self._held:
+            self._wakelock.acquire()
+            self._wifi_lock.acquire()
+            self._held = True
+            logging.info("Wakelock and Wi-Fi lock acquired")
+
+    def _release(self):
+        if self._held:
+            self._wakelock.release()
+            self._wifi_lock.release()
+            self._held = False
+            logging.info("Wakelock and Wi-Fi lock released")
@@ -0,0 +1,24 @@
+import hashlib
+import os
+
+QR_CACHE_DIR = os.path.join('.cache', 'qr')
+
+
+def qr_image_path(url, cache_dir=QR_CACHE_DIR):
+    return os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest() + '.png')
+
+
+def render_qr(url, cache_dir=QR_CACHE_DIR):
+    """Return the path of the QR code PNG for url, rendering it on first use.
+
+    Rendering is slow on phones, call this outside of the UI thread.
+    """
+    path = qr_image_path(url, cache_dir)
+    if os.path.exists(path):
+        return path
+    import qrcode
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    qrcode.make(url, box_size=8, border=2).save(tmp_path, format='PNG')
+    os.replace(tmp_path, path)
+    return path
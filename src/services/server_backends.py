@@ -0,0 +1,140 @@
+import logging
+import threading
+
+# Werkzeug can also upgrade requests of the app to websockets, waitress cannot
+DEFAULT_BACKEND = 'werkzeug'
+DEFAULT_THREADS = 8
+DEFAULT_CONNECTION_LIMIT = 100
+# Seconds an idle keep-alive connection is kept open
+DEFAULT_KEEP_ALIVE = 30
+# Seconds between two checks for a stop while every connection slot is taken
+SLOT_WAIT = 0.5
+
+
+def _bounded_werkzeug_server(host, port, app, connection_limit, keep_alive, stopping, fd=None):
+    """Werkzeug threaded server serving at most connection_limit connections at once"""
+    from werkzeug.serving import ThreadedWSGIServer
+
+    class BoundedWSGIServer(ThreadedWSGIServer):
+        slots = threading.BoundedSemaphore(connection_limit)
+
+        def process_request(self, request, client_address):
+            # Further connections wait in the listen backlog, like with waitress
+            while not self.slots.acquire(timeout=SLOT_WAIT):
+                if stopping.is_set():
+                    self.shutdown_request(request)
+                    return
+            # Reads time out on a connection idle for longer, which closes it
+            request.settimeout(keep_alive)
+            try:
+                super().process_request(request, client_address)
+            except BaseException:
+                self.slots.release()
+                raise
+
+        def process_request_thread(self, request, client_address):
+            try:
+                super().process_request_thread(request, client_address)
+            finally:
+                self.slots.release()
+
+    return BoundedWSGIServer(host, port, app, fd=fd)
+
+
+class WerkzeugBackend:
+    """Werkzeug server, one thread per connection.
+
+    Upgrade requests reach the app with the connection still open, so
+    websocket routes of the Flask app work. The live quiz websocket server
+    of kahiin runs apart, on its own port (see start_companion_servers).
+    At most connection_limit connections are served at once, idle ones are
+    closed after keep_alive seconds. There is no pool, threads is ignored.
+    """
+    name = 'werkzeug'
+
+    def __init__(self, app, host, port, threads, connection_limit, keep_alive, sock=None):
+        self._stopping = threading.Event()
+        fd = None if sock is None else sock.fileno()
+        self._server = _bounded_werkzeug_server(host, port, app, connection_limit, keep_alive, self._stopping, fd)
+        if sock is not None:
+            # Werkzeug listens on a duplicate of the descriptor
+            sock.close()
+
+    def serve(self):
+        self._server.serve_forever()
+
+    def shutdown(self, timeout):
+        """Stop accepting new connections, False if the loop did not stop in time"""
+        self._stopping.set()
+        # socketserver.shutdown() waits forever for a loop that never ran or is stuck
+        stopper = threading.Thread(target=self._server.shutdown, name='kahiin-server-shutdown', daemon=True)
+        stopper.start()
+        stopper.join(timeout)
+        return not stopper.is_alive()
+
+    def close(self):
+        """Free the port once the in-flight requests are drained"""
+        self._server.server_close()
+
+
+class WaitressBackend:
+    """Waitress production server with a fixed worker thread pool.
+
+    HTTP only: waitress cannot hand a connection over to a websocket, so
+    websocket routes of the Flask app fail. kahiin's own websocket server
+    is not affected. Opt in with "serverBackend": "waitress".
+    """
+    name = 'waitress'
+
+    def __init__(self, app, host, port, threads, connection_limit, keep_alive, sock=None):
+        from waitress.server import create_server
+        # Waitress takes either an address to bind or bound sockets
+        listen = {'host': host, 'port': port} if sock is None else {'sockets': [sock]}
+        self._server = create_server(
+            app,
+            **listen,
+            threads=threads,
+            connection_limit=connection_limit,
+            channel_timeout=keep_alive,
+            ident='kahiin',
+        )
+        self._stopping = False
+
+    def serve(self):
+        try:
+            self._server.run()
+        except (OSError, ValueError):
+            # Closing the sockets from another thread interrupts the loop
+            if not self._stopping:
+                raise
+
+    def shutdown(self, timeout):
+        self._stopping = True
+        # New connections are no longer accepted, open channels keep being served
+        self._server.accepting = False
+        return True
+
+    def close(self):
+        from waitress import wasyncore
+        self._server.task_dispatcher.shutdown()
+        # Closing every channel, the listening socket included, ends the loop
+        wasyncore.close_all(self._server._map)
+
+
+BACKENDS = {backend.name: backend for backend in (WerkzeugBackend, WaitressBackend)}
+
+
+def create_backend(name, app, host, port, threads=DEFAULT_THREADS,
+                   connection_limit=DEFAULT_CONNECTION_LIMIT, keep_alive=DEFAULT_KEEP_ALIVE, sock=None):
+    """Create a server backend, bound to host and port unless a listening sock is given"""
+    backend = BACKENDS.get(name)
+    if backend is None:
+        logging.warning(f"Unknown server backend {name}, using {DEFAULT_BACKEND}")
+        backend = BACKENDS[DEFAULT_BACKEND]
+    try:
+        return backend(app, host, port, threads, connection_limit, keep_alive, sock)
+    except ImportError as e:
+        if backend is WerkzeugBackend:
+            raise
+        logging.warning(f"Server backend {backend.name} unavailable ({e}), using werkzeug")
+        return WerkzeugBackend(app, host, port, threads, connection_limit, keep_alive, sock)
@@ -0,0 +1,257 @@
+import importlib
+import logging
+import socket
+import threading
+
+from src.services.server_backends import (
+    create_backend, DEFAULT_BACKEND, DEFAULT_THREADS, DEFAULT_CONNECTION_LIMIT, DEFAULT_KEEP_ALIVE
+)
+from src.services.server_metrics import ServerMetrics
+from src.services.server_supervisor import HealthEndpoint
+from src.services.session_journal import attach_session_journal
+from src.services.static_assets import StaticAssets, load_manifest, STATIC_URL
+
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 8080
+# Number of ports tried, starting from the configured one
+PORT_SCAN_ATTEMPTS = 20
+# Seconds given to in-flight requests and websockets to finish on stop
+DRAIN_TIMEOUT = 5
+
+
+class ServerStartError(OSError):
+    pass
+
+
+_companions_lock = threading.Lock()
+_companions_started = False
+
+
+def _skip_http_server(*args, **kwargs):
+    logging.info("kahiin's own HTTP server skipped, the app is served by the controller")
+
+
+def start_companion_servers(kahiin_app):
+    """Run kahiin's start_flask() for what it starts besides the HTTP app.
+
+    start_flask() also runs the live quiz websocket server, built on the
+    websockets package and listening on its own port. The HTTP app is
+    served by a stoppable backend instead, so app.run() is replaced by a
+    no-op before start_flask() is called. The websocket server cannot be
+    stopped: it is started once and lives as long as the process.
+    """
+    global _companions_started
+    start_flask = getattr(kahiin_app, 'start_flask', None)
+    with _companions_lock:
+        if _companions_started or start_flask is None:
+            return
+        _companions_started = True
+    kahiin_app.app.run = _skip_http_server
+
+    def run():
+        try:
+            start_flask()
+        except Exception:
+            logging.exception("kahiin's websocket server failed")
+
+    threading.Thread(target=run, name='kahiin-websocket', daemon=True).start()
+
+
+def _bind(host, port, reuse_port=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        sock.bind((host, port))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def bind_free_port(host, preferred, attempts=PORT_SCAN_ATTEMPTS, reuse_port=False):
+    """Return a socket bound to the first port from preferred on that is free.
+
+    The bound socket is handed to the backend, so no other process can take
+    the port in between. SO_REUSEADDR is set, so a port left in TIME_WAIT by
+    a previous instance counts as free.
+    """
+    for port in range(preferred, preferred + attempts):
+        try:
+            return _bind(host, port, reuse_port)
+        except OSError:
+            logging.info(f"Port {port} is not available")
+    raise ServerStartError(f"No free port between {preferred} and {preferred + attempts - 1}")
+
+
+def reuse_port_socket(host, port):
+    """Listening socket that other processes can bind to the same port.
+
+    With SO_REUSEPORT the kernel spreads the incoming connections over
+    every process listening on the port.
+    """
+    sock = _bind(host, port, reuse_port=True)
+    sock.listen(socket.SOMAXCONN)
+    return sock
+
+
+class ServerController:
+    """Owns the kahiin server and its thread.
+
+    The kahiin Flask app is served by a stoppable backend (see
+    server_backends) so that it can be started, stopped and restarted
+    without relaunching the app.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, drain_timeout=DRAIN_TIMEOUT,
+                 backend=DEFAULT_BACKEND, threads=DEFAULT_THREADS,
+                 connection_limit=DEFAULT_CONNECTION_LIMIT, keep_alive=DEFAULT_KEEP_ALIVE):
+        self.host = host
+        # Port from the settings, the server may end up on a following one
+        self.configured_port = port
+        self.port = port
+        self.drain_timeout = drain_timeout
+        self.backend = backend
+        self.threads = threads
+        self.connection_limit = connection_limit
+        self.keep_alive = keep_alive
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+        # Activity of the running server, None until it is first started
+        self.metrics = None
+        # Session journal, attached once kahiin is loaded
+        self.journal = None
+        # Whether the server should be running, as opposed to whether it is
+        self.wanted = False
+        # Called without arguments when the server starts and on every request
+        self.activity_listeners = []
+        # Set by worker processes sharing the configured port (see worker_pool)
+        self.reuse_port = False
+        self.use_journal = True
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Build a controller from the server keys of the app settings"""
+        controller = cls()
+        controller.configure(settings)
+        return controller
+
+    def configure(self, settings):
+        """Read the server keys of the app settings, applied at the next start"""
+        self.host = settings.get('serverHost', DEFAULT_HOST)
+        self.configured_port = int(settings.get('serverPort', DEFAULT_PORT))
+        self.backend = settings.get('serverBackend', DEFAULT_BACKEND)
+        self.threads = int(settings.get('serverThreads', DEFAULT_THREADS))
+        self.connection_limit = int(settings.get('serverConnectionLimit', DEFAULT_CONNECTION_LIMIT))
+        self.keep_alive = int(settings.get('serverKeepAlive', DEFAULT_KEEP_ALIVE))
+        if not self.running:
+            self.port = self.configured_port
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, resume=False):
+        """Start the server, restoring the journaled session if resume is set"""
+        with self._lock:
+            if self.running:
+                self.wanted = True
+                return
+            # Imported here so the server stack is only loaded when needed
+            kahiin_app = importlib.import_module('kahiin.app')
+            if self.use_journal and self.journal is None:
+                self.journal = attach_session_journal(kahiin_app, restore=resume)
+            app = getattr(kahiin_app, 'app', None)
+            if app is None:
+                # start_flask() would run a server that can never be stopped or supervised
+                raise ServerStartError("kahiin.app exposes no WSGI app")
+            start_companion_servers(kahiin_app)
+            if self.reuse_port:
+                sock = reuse_port_socket(self.host, self.configured_port)
+            else:
+                sock = bind_free_port(self.host, self.configured_port)
+                sock.listen(socket.SOMAXCONN)
+            self.port = sock.getsockname()[1]
+            # Outermost after the health probes, so static responses are counted and drained on stop
+            self.metrics = ServerMetrics(self._wrap_static(app), on_activity=self._notify_activity)
+            try:
+                self._server = create_backend(
+                    self.backend, HealthEndpoint(self.metrics), self.host, self.port,
+                    threads=self.threads, connection_limit=self.connection_limit, keep_alive=self.keep_alive,
+                    sock=sock,
+                )
+            except Exception:
+                sock.close()
+                raise
+            self._thread = threading.Thread(target=self._serve, name='kahiin-server', daemon=True)
+            self._thread.start()
+            # Only once started, the supervisor must not retry a start the UI reported as failed
+            self.wanted = True
+            logging.info(f"Server started on {self.host}:{self.port} ({self._server.name})")
+        self._notify_activity()
+
+    def _notify_activity(self):
+        for callback in self.activity_listeners:
+            callback()
+
+    def _wrap_static(self, app):
+        """Serve the built static files in front of kahiin, when they exist"""
+        manifest = load_manifest()
+        if not manifest:
+            return app
+        url_prefix = getattr(app, 'static_url_path', None) or STATIC_URL
+        return StaticAssets(app, manifest, url_prefix)
+
+    def _serve(self):
+        try:
+            self._server.serve()
+        except Exception:
+            logging.exception("Server thread crashed")
+
+    def stop(self, timeout=None):
+        """Stop accepting connections, drain the active ones and free the port"""
+        timeout = self.drain_timeout if timeout is None else timeout
+        with self._lock:
+            self.wanted = False
+            if not self.running:
+                if self._server is not None:
+                    # The server thread died, free its port
+                    self._server.close()
+                    self._server = None
+                return True
+            if not self._server.shutdown(timeout):
+                # A stuck loop must not keep the port, nor the lock, forever
+                logging.warning(f"Server loop did not stop within {timeout}s, closing its socket")
+            if not self.metrics.wait_idle(timeout):
+                logging.warning(f"{self.metrics.active} connection(s) still open after {timeout}s, closing anyway")
+            self._server.close()
+            self._thread.join(timeout)
+            self._server = None
+            self._thread = None
+            logging.info("Server stopped")
+            if self.journal is not None:
+                # Keeps a snapshot to resume from, or clears it if no quiz is running
+                try:
+                    self.journal.compact()
+                except Exception:
+                    logging.exception("Unable to snapshot the session")
+            return True
+
+    def restart(self):
+        if self.stop():
+            self.start()
+
+    def recover(self):
+        """Restart a server that died or hung, unless it was stopped meanwhile"""
+        with self._lock:
+            if not self.wanted:
+                return False
+            self.stop()
+            try:
+                self.start()
+            finally:
+                # A failed attempt is retried by the supervisor after its backoff
+                self.wanted = True
+            return True
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import deque
+
+from src.services.tracing import tracer
+
+# Clients seen within this many seconds count as connected players
+PLAYER_TIMEOUT = 60
+LATENCY_SAMPLES = 512
+
+
+def process_rss():
+    """Resident memory of the current process in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is the peak, in kilobytes on Linux and bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class TrackedResponse:
+    """Response iterable of a request, which stays in flight until the server closes it.
+
+    close() is passed on to the wrapped response, so the app's cleanup and
+    its file handles are released, then on_close() is called once.
+    """
+
+    def __init__(self, result, on_close):
+        self._result = result
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self._result)
+
+    def close(self):
+        if self._on_close is None:
+            return
+        on_close, self._on_close = self._on_close, None
+        try:
+            close = getattr(self._result, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            on_close()
+
+
+class ServerMetrics:
+    """WSGI middleware collecting the server activity.
+
+    Per request it only updates a few counters; rates, percentiles and
+    process statistics are computed when snapshot() is called, so the
+    collection costs nothing while nobody looks at it. on_activity() is
+    called at the start of every request, it must be cheap.
+    """
+
+    def __init__(self, app, on_activity=None):
+        self.app = app
+        self.on_activity = on_activity
+        self.active = 0
+        self.websockets = 0
+        self.requests = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.clients = {}
+        # Starting the server counts as activity
+        self.last_activity = time.monotonic()
+        self._idle = threading.Condition()
+        self._last_snapshot = (time.monotonic(), time.process_time(), 0)
+
+    def __call__(self, environ, start_response):
+        start = time.monotonic()
+        is_websocket = environ.get('HTTP_UPGRADE', '').lower() == 'websocket'
+        with self._idle:
+            self.active += 1
+            self.websockets += is_websocket
+            self.clients[environ.get('REMOTE_ADDR')] = start
+            self.last_activity = start
+        if self.on_activity is not None:
+            self.on_activity()
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self._finish(environ, start, is_websocket)
+            raise
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if isinstance(file_wrapper, type) and isinstance(result, file_wrapper):
+            # Handed over unchanged, so the server can send the file without
+            # Python; the request ends here as far as the metrics go
+            self._finish(environ, start, is_websocket)
+            return result
+        return TrackedResponse(result, lambda: self._finish(environ, start, is_websocket))
+
+    def _finish(self, environ, start, is_websocket):
+        end = time.monotonic()
+        with self._idle:
+            self.active -= 1
+            self.websockets -= is_websocket
+            self.requests += 1
+            self.last_activity = end
+            if not is_websocket:
+                self.latencies.append(end - start)
+            if self.active == 0:
+                self._idle.notify_all()
+        if tracer.enabled:
+            tracer.complete(environ.get('PATH_INFO', ''), 'request', start, end,
+                            {'method': environ.get('REQUEST_METHOD')})
+
+    def wait_idle(self, timeout):
+        with self._idle:
+            return self._idle.wait_for(lambda: self.active == 0, timeout)
+
+    def snapshot(self):
+        now, cpu = time.monotonic(), time.process_time()
+        with self._idle:
+            for client, seen in list(self.clients.items()):
+                if now - seen > PLAYER_TIMEOUT:
+                    del self.clients[client]
+            players = len(self.clients)
+            requests = self.requests
+            latencies = sorted(self.latencies)
+            websockets = self.websockets
+        last_time, last_cpu, last_requests = self._last_snapshot
+        self._last_snapshot = (now, cpu, requests)
+        elapsed = max(now - last_time, 1e-6)
+        return {
+            'players': players,
+            'requests_per_s': (requests - last_requests) / elapsed,
+            'websockets': websockets,
+            'p95_ms': latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000 if latencies else None,
+            'cpu_percent': 100 * (cpu - last_cpu) / elapsed,
+            'rss_mb': process_rss() / 2**20,
+            'threads': threading.active_count(),
+        }
@@ -0,0 +1,159 @@
+"""Keeps the quiz server alive while it is meant to run.
+
+The supervisor probes a health endpoint answered in front of the app, on
+the address the server listens on, or over loopback when it listens on
+every interface. A server whose thread died, or which misses several
+probes in a row, is restarted with an exponential backoff. Probes slower than
+SLOW_THRESHOLD mark the server as slow without restarting it, so that a
+busy server can be told from a dead one.
+"""
+import http.client
+import logging
+import threading
+import time
+
+HEALTH_PATH = '/__kahiin/health'
+PROBE_INTERVAL = 5
+PROBE_TIMEOUT = 2
+SLOW_THRESHOLD = 1.0
+# Addresses the server listens on every interface with, probed over loopback
+WILDCARD_HOSTS = ('', '0.0.0.0')
+# Missed probes in a row after which the server counts as hung
+UNRESPONSIVE_PROBES = 3
+MIN_BACKOFF = 1
+MAX_BACKOFF = 60
+# Healthy seconds after which the backoff starts over
+BACKOFF_RESET = 120
+
+STATUS_STOPPED = 'stopped'
+STATUS_OK = 'ok'
+STATUS_SLOW = 'slow'
+STATUS_UNRESPONSIVE = 'unresponsive'
+STATUS_CRASHED = 'crashed'
+
+
+class HealthEndpoint:
+    """WSGI middleware answering the supervisor probes.
+
+    It sits in front of the metrics so probes do not count as players, but
+    behind the server's worker pool, so a saturated pool delays them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') != HEALTH_PATH:
+            return self.app(environ, start_response)
+        start_response('200 OK', [('Content-Type', 'text/plain'), ('Cache-Control', 'no-store')])
+        return [b'ok']
+
+
+class ServerSupervisor:
+    def __init__(self, controller, interval=PROBE_INTERVAL, timeout=PROBE_TIMEOUT,
+                 slow_threshold=SLOW_THRESHOLD):
+        self.controller = controller
+        self.interval = interval
+        self.timeout = timeout
+        self.slow_threshold = slow_threshold
+        self.status = STATUS_STOPPED
+        self.latency = None
+        self.restarts = 0
+        self._missed = 0
+        self._backoff = MIN_BACKOFF
+        self._next_restart = 0
+        self._healthy_since = None
+        self._listeners = []
+        self._stop = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, name='kahiin-supervisor', daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self, callback):
+        """Call callback(snapshot) from the supervisor thread after every restart"""
+        self._listeners.append(callback)
+
+    def snapshot(self):
+        return {
+            'status': self.status,
+            'latency_ms': None if self.latency is None else self.latency * 1000,
+            'restarts': self.restarts,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logging.exception("Server supervision failed")
+
+    def probe(self):
+        """Return the health endpoint latency in seconds, None if it did not answer"""
+        host = self.controller.host
+        if host in WILDCARD_HOSTS:
+            host = '127.0.0.1'
+        connection = http.client.HTTPConnection(host, self.controller.port, timeout=self.timeout)
+        start = time.monotonic()
+        try:
+            connection.request('GET', HEALTH_PATH)
+            connection.getresponse().read()
+        except (OSError, http.client.HTTPException):
+            return None
+        finally:
+            connection.close()
+        return time.monotonic() - start
+
+    def check(self):
+        controller = self.controller
+        if not controller.wanted:
+            self.status, self.latency, self._missed = STATUS_STOPPED, None, 0
+            return
+        if not controller.running:
+            self.status = STATUS_CRASHED
+            self._restart("Server thread is not running")
+            return
+
+        self.latency = self.probe()
+        if self.latency is None:
+            self._missed += 1
+            self._healthy_since = None
+            logging.warning(f"Health probe missed ({self._missed}/{UNRESPONSIVE_PROBES})")
+            if self._missed >= UNRESPONSIVE_PROBES:
+                self.status = STATUS_UNRESPONSIVE
+                self._restart(f"Server missed {self._missed} health probes")
+            return
+
+        self._missed = 0
+        if self.latency > self.slow_threshold:
+            self.status = STATUS_SLOW
+            logging.warning(f"Server slow, health probe took {self.latency * 1000:.0f} ms")
+        else:
+            self.status = STATUS_OK
+        now = time.monotonic()
+        if self._healthy_since is None:
+            self._healthy_since = now
+        elif now - self._healthy_since > BACKOFF_RESET:
+            self._backoff = MIN_BACKOFF
+
+    def _restart(self, reason):
+        now = time.monotonic()
+        if now < self._next_restart:
+            return
+        logging.error(f"{reason}, restarting it (next attempt in {self._backoff}s at the earliest)")
+        self._next_restart = now + self._backoff
+        self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+        self._healthy_since = None
+        try:
+            if not self.controller.recover():
+                return
+        except OSError as e:
+            logging.error(f"Server restart failed: {e}")
+            return
+        self.restarts += 1
+        self._missed = 0
+        # The port may have changed
+        for callback in self._listeners:
+            callback(self.snapshot())
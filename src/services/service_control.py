@@ -0,0 +1,181 @@
+"""Control channel between the UI and the server running in the Android service.
+
+The service listens on a loopback TCP port and answers one JSON command per
+line with one JSON reply per line. Any local app can reach a loopback port,
+so every command carries a per-install token kept in the app's private
+storage, and commands without it are refused.
+"""
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import socketserver
+import threading
+import time
+
+CONTROL_HOST = '127.0.0.1'
+CONTROL_PORT = 8079
+# In the app directory, private to the app on Android
+TOKEN_FILE = os.path.join('.cache', 'control.token')
+# Seconds to wait for the service to answer after being started or stopped
+SERVICE_TIMEOUT = 15
+
+_token = None
+
+
+class ControlError(OSError):
+    pass
+
+
+def control_token(path=TOKEN_FILE):
+    """Token shared by the UI and the service, created on first use"""
+    global _token
+    if _token is None:
+        try:
+            with open(path, 'r') as f:
+                _token = f.read().strip()
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(secrets.token_hex(16))
+            try:
+                # Fails if the other process created it first, its token wins
+                os.link(tmp_path, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp_path)
+            with open(path, 'r') as f:
+                _token = f.read().strip()
+    return _token
+
+
+def send_command(command, timeout=2, port=CONTROL_PORT, **params):
+    with socket.create_connection((CONTROL_HOST, port), timeout=timeout) as s:
+        s.sendall(json.dumps({'command': command, 'token': control_token(), **params}).encode() + b'\n')
+        reply = json.loads(s.makefile('rb').readline())
+    if 'error' in reply:
+        raise ControlError(reply['error'])
+    return reply
+
+
+class _ControlHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+            if not hmac.compare_digest(str(request.pop('token', '')), control_token()):
+                logging.warning(f"Control command {request.get('command')!r} refused, wrong token")
+                self.wfile.write(json.dumps({'error': 'unauthorized'}).encode() + b'\n')
+                return
+            handler = self.server.commands[request.pop('command')]
+            reply = handler(**request) or {}
+        except Exception as e:
+            logging.exception("Control command failed")
+            reply = {'error': str(e)}
+        self.wfile.write(json.dumps(reply).encode() + b'\n')
+
+
+class ControlServer(socketserver.ThreadingTCPServer):
+    """Serves the commands of a ServerController to the UI process"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, controller, port=CONTROL_PORT, on_stop=None, extra_commands=None):
+        self.controller = controller
+        self.on_stop = on_stop
+        self.commands = {
+            'status': self._status,
+            'start': self._start,
+            'stop': self._stop,
+            'metrics': self._metrics,
+            **(extra_commands or {}),
+        }
+        super().__init__((CONTROL_HOST, port), _ControlHandler)
+
+    def _status(self):
+        return {'running': self.controller.running, 'port': self.controller.port}
+
+    def _start(self, resume=False):
+        self.controller.start(resume=resume)
+        return self._status()
+
+    def _stop(self):
+        stopped = self.controller.stop()
+        if stopped and self.on_stop:
+            # Reply first, the service goes away right after
+            threading.Timer(0.5, self.on_stop).start()
+        return {'stopped': stopped}
+
+    def _metrics(self):
+        metrics = self.controller.metrics
+        return metrics.snapshot() if metrics else {}
+
+
+class RemoteMetrics:
+    def snapshot(self):
+        return send_command('metrics')
+
+
+class RemoteServerController:
+    """ServerController counterpart used by the UI when the server runs in the service.
+
+    Every call is a socket round trip, so running is the status last
+    reported by the service and refresh() asks it again, off the UI thread.
+    """
+
+    def __init__(self, start_service, port):
+        self._start_service = start_service
+        # Configured port until the service reports the bound one
+        self.port = port
+        self.metrics = None
+        self.running = False
+
+    def _status(self):
+        try:
+            return send_command('status', timeout=0.5)
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Ask the service whether the server runs, and return it"""
+        status = self._status()
+        self.running = bool(status and status['running'])
+        if self.running:
+            self.port = status['port']
+            self.metrics = RemoteMetrics()
+        return self.running
+
+    def start(self, resume=False):
+        if self._status() is None:
+            self._start_service()
+        deadline = time.monotonic() + SERVICE_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._status() is not None:
+                reply = send_command('start', timeout=SERVICE_TIMEOUT, resume=resume)
+                self.port = reply['port']
+                self.metrics = RemoteMetrics()
+                self.running = True
+                return
+            time.sleep(0.2)
+        raise ControlError("Server service did not answer")
+
+    def health(self):
+        return send_command('health')
+
+    def set_wakelock(self, enabled):
+        send_command('wakelock', enabled=enabled)
+
+    def stop(self, timeout=None):
+        if self._status() is None:
+            # Service already gone
+            self.running = False
+            return True
+        # The service stops itself once the server is down
+        stopped = send_command('stop', timeout=SERVICE_TIMEOUT)['stopped']
+        if stopped:
+            self.running = False
+        return stopped
@@ -0,0 +1,225 @@
+"""Crash-safe journal of the quiz session.
+
+kahiin reports every change of its session state as a (path, value)
+record, appended to journal.jsonl and fsynced in batches. From time to
+time the whole state is exported to snapshot.json and the journal is cut
+down to the records that came after it. After a crash, the state is the
+latest snapshot with the journal tail applied on top.
+
+The hooks are looked up on kahiin.app and are all optional. They belong to
+the kahiin submodule; until it provides them the journal stays disabled:
+
+    set_session_listener(callback)  kahiin calls callback(path, value) on
+                                    every change, path being a list of
+                                    keys and a None value removing it
+    export_session()                the JSON-serializable state, or None
+                                    when no quiz is running
+    import_session(state)           restore a state after a relaunch
+
+Without a listener the state is snapshotted every SNAPSHOT_INTERVAL.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+JOURNAL_DIR = os.path.join('.cache', 'session')
+# Records are fsynced together at most this many seconds after being written
+FSYNC_INTERVAL = 0.2
+# Records after which the journal is compacted into a snapshot
+COMPACT_EVERY = 500
+# Seconds between two snapshots when kahiin reports no records
+SNAPSHOT_INTERVAL = 5
+
+
+def apply_record(state, path, value):
+    target = state
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    if value is None:
+        target.pop(path[-1], None)
+    else:
+        target[path[-1]] = value
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _record_seq(line):
+    try:
+        return json.loads(line)['seq']
+    except (ValueError, KeyError):
+        return -1
+
+
+class SessionJournal:
+    def __init__(self, directory=JOURNAL_DIR, fsync_interval=FSYNC_INTERVAL, compact_every=COMPACT_EVERY):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, 'snapshot.json')
+        self.journal_path = os.path.join(directory, 'journal.jsonl')
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.snapshot_interval = None
+        self.seq = 0
+        self._exporter = None
+        self._file = None
+        self._dirty = False
+        self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+        # _lock guards the writes, _sync_lock keeps the file open while fsyncing
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def has_session(self):
+        try:
+            return os.path.exists(self.snapshot_path) or os.path.getsize(self.journal_path) > 0
+        except OSError:
+            return False
+
+    def load(self):
+        """Rebuild the state from the snapshot and the journal tail"""
+        state, seq = {}, 0
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            state, seq = snapshot['state'], snapshot['seq']
+        except (OSError, ValueError, KeyError):
+            pass
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn last write
+                        break
+                    if record['seq'] > seq:
+                        apply_record(state, record['path'], record['value'])
+                        seq = record['seq']
+        except FileNotFoundError:
+            pass
+        self.seq = seq
+        return state
+
+    def open(self, exporter=None):
+        """Start appending records, after load() so numbering goes on"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._exporter = exporter
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+        threading.Thread(target=self._run, name='kahiin-journal', daemon=True).start()
+        atexit.register(self.close)
+
+    def record(self, path, value):
+        with self._lock:
+            if self._file is None:
+                return
+            self.seq += 1
+            line = json.dumps({'seq': self.seq, 'path': list(path), 'value': value}, separators=(',', ':'))
+            self._file.write(line + '\n')
+            self._dirty = True
+            self._since_snapshot += 1
+
+    def sync(self):
+        with self._sync_lock:
+            with self._lock:
+                if not self._dirty or self._file is None:
+                    return
+                self._file.flush()
+                self._dirty = False
+            os.fsync(self._file.fileno())
+
+    def compact(self):
+        """Snapshot the exported state and drop the journal records it covers"""
+        if self._exporter is None:
+            return
+        with self._lock:
+            seq = self.seq
+            self._since_snapshot = 0
+        self._last_snapshot = time.monotonic()
+        # Records written while exporting are kept, replaying them is harmless
+        state = self._exporter()
+        if not state:
+            self.clear()
+            return
+        _write_atomic(self.snapshot_path, json.dumps({'seq': seq, 'state': state}))
+        with self._sync_lock, self._lock:
+            if self._file is None:
+                return
+            self._file.close()
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                tail = [line for line in f if line.endswith('\n') and _record_seq(line) > seq]
+            _write_atomic(self.journal_path, ''.join(tail))
+            self._file = open(self.journal_path, 'a', encoding='utf-8')
+            self._dirty = False
+
+    def clear(self):
+        """Forget the session, once it has ended or has been discarded"""
+        with self._sync_lock, self._lock:
+            if os.path.exists(self.snapshot_path):
+                os.remove(self.snapshot_path)
+            if self._file is not None:
+                self._file.flush()
+                self._file.truncate(0)
+                self._dirty = False
+            elif os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+
+    def _run(self):
+        while not self._stop.wait(self.fsync_interval):
+            try:
+                self.sync()
+                if self._since_snapshot >= self.compact_every or (
+                        self.snapshot_interval is not None
+                        and time.monotonic() - self._last_snapshot >= self.snapshot_interval):
+                    self.compact()
+            except Exception:
+                logging.exception("Session journal update failed")
+
+    def close(self):
+        self._stop.set()
+        self.sync()
+        with self._sync_lock, self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def attach_session_journal(kahiin_app, journal=None, restore=False):
+    """Journal the changes of the kahiin session.
+
+    The saved session is restored into kahiin only if restore is set, as
+    chosen by the user, and dropped otherwise. Returns the journal, or None
+    when kahiin exposes none of the hooks.
+    """
+    listen = getattr(kahiin_app, 'set_session_listener', None)
+    export = getattr(kahiin_app, 'export_session', None)
+    if listen is None and export is None:
+        logging.info("kahiin exposes no session hooks, the session journal is disabled")
+        return None
+    journal = journal or SessionJournal()
+    import_session = getattr(kahiin_app, 'import_session', None)
+    if restore and import_session is not None:
+        start = time.perf_counter()
+        state = journal.load()
+        if state:
+            import_session(state)
+            logging.info(f"Session restored up to record {journal.seq} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    elif journal.has_session():
+        # Its records must not be replayed over the new session
+        logging.info("Previous session not resumed, discarding it")
+        journal.clear()
+    journal.open(export)
+    if listen is not None:
+        listen(journal.record)
+    else:
+        journal.snapshot_interval = SNAPSHOT_INTERVAL
+    return journal
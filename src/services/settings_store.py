@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from src.services.file_watcher import FileWatcher
+
+APP_SETTINGS_PATH = 'settings.json'
+KAHIIN_SETTINGS_PATH = os.path.join('kahiin', 'settings.json')
+# Kept out of the settings directories, kahiin is a git submodule
+LOCK_DIR = os.path.join('.cache', 'locks')
+
+# Delay used to coalesce several changes into a single write
+FLUSH_DELAY = 0.5
+
+
+class SettingsStore:
+    """In-memory view of a JSON settings file.
+
+    The file is parsed once, reads are served from memory and writes are
+    batched and written atomically from a background timer thread, so the
+    Kivy main loop never touches the disk when a setting changes.
+
+    Only the keys changed through this store are written, merged over the
+    current content of the file, so another process writing other keys in
+    the meantime is not clobbered. Once watched, changes made by other
+    writers are merged in and pushed to the subscribers.
+
+    Writers need no version counter to detect races: the flush holds an
+    flock, shared by the launcher and the server service, from the read of
+    the file to its replace, so no flush is based on outdated content.
+    """
+
+    def __init__(self, path, flush_delay=FLUSH_DELAY):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._flush_timer = None
+        # Serializes flushes and merges of external changes
+        self._write_lock = threading.RLock()
+        self._dirty_keys = set()
+        self._listeners = []
+        self._watcher = None
+        self._data = self._read()
+        # Last content known to be on disk
+        self._disk = dict(self._data)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            logging.warning(f"Settings file {self.path} not found, using empty settings")
+            return {}
+
+    def _read_disk(self):
+        # None while another writer is halfway through a non-atomic write
+        try:
+            return self._read()
+        except ValueError:
+            return None
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._data.get(key, default)
+
+    def snapshot(self):
+        """Return a copy of the current settings"""
+        with self._lock:
+            return dict(self._data)
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        with self._lock:
+            self._data.update(values)
+            self._dirty_keys.update(values)
+            self._schedule_flush()
+
+    def toggle(self, key):
+        """Invert a boolean setting and return its new value"""
+        with self._lock:
+            value = not self._data.get(key, False)
+            self.set(key, value)
+            return value
+
+    def subscribe(self, callback):
+        """Call callback(changed) from the watcher thread when another writer changes keys"""
+        self._listeners.append(callback)
+        self.watch()
+
+    def watch(self):
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = FileWatcher(self.path, self._on_file_changed)
+                self._watcher.start()
+
+    def _on_file_changed(self):
+        with self._write_lock:
+            disk = self._read_disk()
+            # Our own writes come back as events too
+            if disk is None or disk == self._disk:
+                return
+            self._merge(disk)
+
+    def _merge(self, disk, keep=()):
+        """Apply the keys changed on disk since the last read, except pending ones"""
+        with self._lock:
+            changed = {
+                key: value for key, value in disk.items()
+                if self._disk.get(key) != value and key not in self._dirty_keys and key not in keep
+            }
+            self._data.update(changed)
+            self._disk = disk
+        if changed:
+            logging.info(f"Settings {', '.join(changed)} changed in {self.path}")
+            for callback in self._listeners:
+                callback(changed)
+
+    def _schedule_flush(self):
+        if self._flush_timer is not None:
+            return
+        self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self):
+        """Write pending changes to disk atomically.
+
+        The write lock is held from the snapshot to the replace, so the timer
+        thread and flush_all() never write an older snapshot over a newer one.
+        """
+        with self._write_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty_keys:
+                    return
+                pending = {key: self._data[key] for key in self._dirty_keys}
+                self._dirty_keys = set()
+            try:
+                # Keys written by another process since our last read are kept,
+                # the lock keeps the launcher and the server service from interleaving
+                with _file_lock(self.path):
+                    disk = self._read_disk()
+                    if disk is None:
+                        disk = dict(self._disk)
+                    data = {**disk, **pending}
+                    # Per process, fcntl is missing on Windows and the lock is a no-op there
+                    tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'w') as f:
+                        json.dump(data, f)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.error(f"Unable to write settings to {self.path}: {e}")
+                with self._lock:
+                    self._dirty_keys.update(pending)
+                return
+            self._merge(disk, keep=pending)
+            with self._lock:
+                self._disk = data
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock shared by every process flushing path"""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(os.path.join(LOCK_DIR, path.replace(os.sep, '_') + '.lock'), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path):
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = SettingsStore(path)
+        return _stores[path]
+
+
+def app_settings():
+    return get_store(APP_SETTINGS_PATH)
+
+
+def kahiin_settings():
+    return get_store(KAHIIN_SETTINGS_PATH)
+
+
+def flush_all():
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
@@ -2,10 +2,23 @@ import signal
 import logging
 import sys
 
-def setup_signal_handlers():
+def setup_signal_handlers(cleanup=None):
+    """Exit cleanly on SIGINT and SIGTERM, running cleanup first if given"""
+    cleaning_up = []
+
     def signal_handler(signum, frame):
+        if cleaning_up:
+            # systemd and Ctrl+C signal the whole process group, which may get it twice
+            logging.info(f"Received signal {signum} during cleanup, ignored")
+            return
+        cleaning_up.append(signum)
         logging.info(f"Received signal {signum}. Performing cleanup...")
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception:
+                logging.exception("Cleanup failed")
         sys.exit(0)
     
     signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
\ No newline at end of file
+    signal.signal(signal.SIGTERM, signal_handler)
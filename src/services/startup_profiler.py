@@ -0,0 +1,68 @@
+"""Startup instrumentation, enabled with the KAHIIN_PROFILE_STARTUP=1 environment variable.
+
+Records the wall time of every module imported for the first time and of
+the named build phases, then logs the slowest ones and writes them to
+startup_profile.json once the first frame is drawn.
+"""
+import builtins
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ENABLED = os.environ.get('KAHIIN_PROFILE_STARTUP') == '1'
+PROFILE_FILE = 'startup_profile.json'
+REPORTED_IMPORTS = 20
+
+_start = time.perf_counter()
+_imports = []
+_phases = []
+_import_depth = 0
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    global _import_depth
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _import_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _import_depth -= 1
+        _imports.append({'module': name, 'ms': (time.perf_counter() - start) * 1000, 'depth': _import_depth})
+
+
+def install_import_timer():
+    if ENABLED:
+        builtins.__import__ = _timed_import
+
+
+@contextmanager
+def phase(name):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append({'phase': name, 'start_ms': (start - _start) * 1000, 'ms': (time.perf_counter() - start) * 1000})
+
+
+def report():
+    if not ENABLED:
+        return
+    builtins.__import__ = _original_import
+    total_ms = (time.perf_counter() - _start) * 1000
+    top_imports = sorted((i for i in _imports if i['depth'] == 0), key=lambda i: i['ms'], reverse=True)
+    logging.info(f"Startup took {total_ms:.0f} ms until the first frame")
+    for entry in _phases:
+        logging.info(f"  phase {entry['phase']}: {entry['ms']:.1f} ms")
+    for entry in top_imports[:REPORTED_IMPORTS]:
+        logging.info(f"  import {entry['module']}: {entry['ms']:.1f} ms")
+    with open(PROFILE_FILE, 'w') as f:
+        json.dump({'total_ms': total_ms, 'phases': _phases, 'imports': _imports}, f, indent=2)
@@ -0,0 +1,255 @@
+"""Precompressed, fingerprinted copies of the kahiin static files.
+
+The build step copies every file of kahiin/web/static to static_dist/
+under a content-hashed name, with gzip (and brotli, when the brotli
+package is installed) variants, and writes a manifest:
+
+    python -m src.services.static_assets
+
+At runtime StaticAssets answers the static URLs from that manifest, before
+the request reaches Flask, with ETags, 304s, cache headers and the
+server's wsgi.file_wrapper. Werkzeug has no file wrapper, so with the
+default backend the files are read in blocks from Python; waitress sends
+them itself. Files changed since the build are left to Flask.
+The static URLs of the HTML pages rendered by kahiin are rewritten to the
+fingerprinted names, which are cached as immutable by the browsers.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_SOURCE = os.path.join('kahiin', 'web', 'static')
+DIST_DIR = 'static_dist'
+MANIFEST_FILE = 'manifest.json'
+STATIC_URL = '/static'
+# Already compressed formats are only fingerprinted
+COMPRESSIBLE_EXTS = {'.css', '.js', '.html', '.json', '.svg', '.otf', '.ttf', '.txt', '.xml'}
+# A variant is kept only if it saves at least this fraction of the size
+MIN_SAVING = 0.1
+# Plain URLs are revalidated after a lesson, fingerprinted ones never change
+PLAIN_MAX_AGE = 3600
+HASHED_MAX_AGE = 365 * 24 * 3600
+BLOCK_SIZE = 64 * 1024
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _hashed_name(path, digest):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{digest}{ext}"
+
+
+def _write_variant(data, path, compress):
+    compressed = compress(data)
+    if len(compressed) > len(data) * (1 - MIN_SAVING):
+        return None
+    with open(path, 'wb') as f:
+        f.write(compressed)
+    return len(compressed)
+
+
+def compile_static_assets(source=STATIC_SOURCE, dist_dir=DIST_DIR):
+    """Build dist_dir from source and return the manifest"""
+    if os.path.isdir(dist_dir):
+        shutil.rmtree(dist_dir)
+    manifest = {}
+    for directory, _, files in os.walk(source):
+        for name in sorted(files):
+            source_path = os.path.join(directory, name)
+            relpath = os.path.relpath(source_path, source).replace(os.sep, '/')
+            with open(source_path, 'rb') as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = _hashed_name(relpath, digest)
+            target = os.path.join(dist_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+
+            encodings = {}
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTS:
+                size = _write_variant(data, target + '.gz', lambda d: gzip.compress(d, 9, mtime=0))
+                if size:
+                    encodings['gzip'] = size
+                if brotli is not None:
+                    size = _write_variant(data, target + '.br', lambda d: brotli.compress(d, quality=11))
+                    if size:
+                        encodings['br'] = size
+
+            st = os.stat(source_path)
+            manifest[relpath] = {
+                'file': hashed,
+                'etag': digest,
+                'size': len(data),
+                'mtime_ns': st.st_mtime_ns,
+                'type': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                'encodings': encodings,
+            }
+    os.makedirs(dist_dir, exist_ok=True)
+    with open(os.path.join(dist_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(source=STATIC_SOURCE, dist_dir=DIST_DIR):
+    """Return the manifest entries that still match their source file"""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if 'ANDROID_ARGUMENT' in os.environ:
+        # Both copies come from the same APK, and extraction does not keep mtimes
+        return manifest
+    fresh = {}
+    for relpath, entry in manifest.items():
+        try:
+            st = os.stat(os.path.join(source, relpath))
+        except FileNotFoundError:
+            # Only the built copy is shipped
+            fresh[relpath] = entry
+            continue
+        if st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']:
+            fresh[relpath] = entry
+    if len(fresh) < len(manifest):
+        logging.info(f"{len(manifest) - len(fresh)} static file(s) changed since the build, served by Flask")
+    return fresh
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _etag_matches(header, etag):
+    if header.strip() == '*':
+        return True
+    # Weak validators and the per-encoding suffix all name the same content
+    return any(tag.strip().lstrip('W/').strip('"').split('-')[0] == etag for tag in header.split(','))
+
+
+def _header(headers, name):
+    return next((value for key, value in headers if key.lower() == name), None)
+
+
+def _read_blocks(f):
+    with f:
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                return
+            yield block
+
+
+class StaticAssets:
+    """WSGI middleware serving the built static files in front of app"""
+
+    def __init__(self, app, manifest, url_prefix=STATIC_URL, dist_dir=DIST_DIR):
+        self.app = app
+        self.dist_dir = dist_dir
+        prefix = url_prefix.rstrip('/')
+        self.routes = {}
+        self.hashed_urls = {}
+        for relpath, entry in manifest.items():
+            self.routes[f"{prefix}/{relpath}"] = (entry, PLAIN_MAX_AGE)
+            self.routes[f"{prefix}/{entry['file']}"] = (entry, HASHED_MAX_AGE)
+            self.hashed_urls[f"{prefix}/{relpath}".encode()] = f"{prefix}/{entry['file']}".encode()
+        self._url_pattern = re.compile(re.escape(prefix.encode()) + rb'/[\w./-]+')
+
+    def __call__(self, environ, start_response):
+        route = self.routes.get(environ.get('PATH_INFO', ''))
+        if environ.get('REQUEST_METHOD') not in ('GET', 'HEAD') or 'HTTP_UPGRADE' in environ:
+            return self.app(environ, start_response)
+        if route is None:
+            if environ['REQUEST_METHOD'] == 'HEAD':
+                return self.app(environ, start_response)
+            return self._rewrite_page(environ, start_response)
+        if 'HTTP_RANGE' in environ:
+            return self.app(environ, start_response)
+        return self._serve(environ, start_response, *route)
+
+    def _hashed_url(self, match):
+        return self.hashed_urls.get(match.group(0), match.group(0))
+
+    def _rewrite_page(self, environ, start_response):
+        """Point the static URLs of an HTML page to their fingerprinted copies"""
+        state = {}
+
+        def capture(status, headers, exc_info=None):
+            if (state.get('forward') or not status.startswith('200')
+                    or not (_header(headers, 'content-type') or '').startswith('text/html')
+                    or _header(headers, 'content-encoding')):
+                state['forward'] = True
+                return start_response(status, headers, exc_info)
+            state['response'] = (status, headers)
+            return state.setdefault('written', []).append
+
+        body = self.app(environ, capture)
+        if 'response' not in state:
+            # Not a page, or a response started lazily, which is streamed as is
+            state['forward'] = True
+            return body
+        try:
+            data = b''.join(state.get('written', [])) + b''.join(body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        data = self._url_pattern.sub(self._hashed_url, data)
+        status, headers = state['response']
+        headers = [(key, value) for key, value in headers if key.lower() not in ('content-length', 'etag')]
+        start_response(status, headers + [('Content-Length', str(len(data)))])
+        return [data]
+
+    def _serve(self, environ, start_response, entry, max_age):
+        cache_control = f"public, max-age={max_age}" + (', immutable' if max_age == HASHED_MAX_AGE else '')
+        headers = [('Cache-Control', cache_control), ('Vary', 'Accept-Encoding')]
+        path, size, etag = os.path.join(self.dist_dir, entry['file']), entry['size'], entry['etag']
+        content_encoding = None
+        accepted = _accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, suffix in ENCODINGS:
+            if encoding in entry['encodings'] and encoding in accepted:
+                path, size, etag = path + suffix, entry['encodings'][encoding], f"{etag}-{encoding}"
+                content_encoding = encoding
+                break
+        if _etag_matches(environ.get('HTTP_IF_NONE_MATCH', ''), entry['etag']):
+            # The same validator as the 200 of this encoding
+            start_response('304 Not Modified', headers + [('ETag', f'"{etag}"')])
+            return []
+        if content_encoding is not None:
+            headers.append(('Content-Encoding', content_encoding))
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            logging.warning(f"Built static file {path} is missing, served by Flask")
+            return self.app(environ, start_response)
+        start_response('200 OK', headers + [
+            ('Content-Type', entry['type']),
+            ('Content-Length', str(size)),
+            ('ETag', f'"{etag}"'),
+        ])
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            f.close()
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        return file_wrapper(f, BLOCK_SIZE) if file_wrapper else _read_blocks(f)
+
+
+if __name__ == '__main__':
+    manifest = compile_static_assets()
+    variants = sum(len(entry['encodings']) for entry in manifest.values())
+    print(f"{len(manifest)} static files and {variants} compressed variants written to {DIST_DIR}/"
+          + ("" if brotli else " (brotli not installed, gzip only)"))
@@ -0,0 +1,252 @@
+"""Opt-in profiling of live sessions.
+
+Spans around UI callbacks and server requests, plus periodic stack samples
+of the UI and server threads, are written to kahiin_trace.json in the
+Chrome trace event format, which chrome://tracing can open. Samples use the
+stackFrames/samples sections, so a stack seen many times is stored once.
+
+While profiling, the recorded events are appended every WRITE_INTERVAL to
+spool files in SPOOL_DIR. The trace file is assembled from them by a
+background thread when profiling is disabled.
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TRACE_FILE = 'kahiin_trace.json'
+SPOOL_DIR = os.path.join('.cache', 'trace')
+# 50 samples per second and sampled thread
+SAMPLE_INTERVAL = 0.02
+# Seconds between two appends to the spool files
+WRITE_INTERVAL = 1
+SAMPLED_FRAMES = 8
+# Spans and samples after which recording stops, a few tens of MB of trace
+MAX_EVENTS = 1000000
+# Sampled besides the UI thread, werkzeug request threads are matched by their target
+SERVER_THREAD_PREFIXES = ('kahiin-server', 'waitress')
+SERVER_THREAD_TARGET = '(process_request_thread)'
+# Innermost frames of a thread blocked on I/O or a lock, such samples are skipped
+IDLE_FRAMES = {
+    ('wait', 'threading.py'),
+    ('select', 'selectors.py'),
+    ('poll', 'selectors.py'),
+    ('accept', 'socket.py'),
+    ('readinto', 'socket.py'),
+}
+
+
+def _frame_stack(frame):
+    """Innermost first list of (function, file, line) of frame"""
+    stack = []
+    while frame is not None and len(stack) < SAMPLED_FRAMES:
+        code = frame.f_code
+        stack.append((code.co_name, os.path.basename(code.co_filename), frame.f_lineno))
+        frame = frame.f_back
+    return stack
+
+
+def _is_sampled(thread):
+    if thread is threading.main_thread():
+        return True
+    return thread.name.startswith(SERVER_THREAD_PREFIXES) or thread.name.endswith(SERVER_THREAD_TARGET)
+
+
+def _copy_lines(out, path, first=True):
+    """Append the lines of path to out as comma separated items, after others unless first"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not first:
+                    out.write(',')
+                out.write(line.rstrip('\n'))
+                first = False
+    except FileNotFoundError:
+        pass
+
+
+class Tracer:
+    def __init__(self, path=TRACE_FILE, spool_dir=SPOOL_DIR):
+        self.path = path
+        self.spool_dir = spool_dir
+        self.enabled = False
+        # Spans waiting to be appended to the spool, drained by the sampler thread
+        self.events = deque()
+        self._start = time.monotonic()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._writer = None
+        self._recorded = 0
+        # Only touched by the sampler thread
+        self._samples = []
+        self._frames = {}
+        self._new_frames = []
+        self._thread_names = {}
+
+    def _us(self, timestamp):
+        return int((timestamp - self._start) * 1e6)
+
+    def _spool(self, name):
+        return os.path.join(self.spool_dir, f"{name}.jsonl")
+
+    def enable(self):
+        if self.enabled:
+            return
+        if self._writer is not None:
+            # The previous trace is still being assembled from the spool
+            self._writer.join()
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for name in ('events', 'frames', 'samples'):
+            open(self._spool(name), 'w').close()
+        self.events.clear()
+        self._samples, self._frames, self._new_frames = [], {}, []
+        self._thread_names = {}
+        self._recorded = 0
+        self.enabled = True
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name='kahiin-tracer', daemon=True)
+        self._sampler.start()
+        logging.info(f"Profiling enabled, trace written to {self.path} when it is disabled")
+
+    def disable(self, wait=False):
+        """Stop recording and write the trace file from a background thread"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._sampler.join()
+        self._writer = threading.Thread(target=self.write, name='kahiin-trace-writer', daemon=True)
+        self._writer.start()
+        if wait:
+            # On exit, the daemon thread would be killed halfway
+            self._writer.join()
+
+    def complete(self, name, category, start, end, args=None):
+        """Record a span measured with time.monotonic()"""
+        if self._recorded >= MAX_EVENTS:
+            return
+        event = {
+            'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+            'ts': self._us(start), 'dur': self._us(end) - self._us(start),
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    @contextmanager
+    def span(self, name, category='ui'):
+        if not self.enabled:
+            yield
+            return
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.complete(name, category, start, time.monotonic())
+
+    def traced(self, name=None, category='ui'):
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name, category):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _stack_id(self, stack):
+        parent = None
+        for function, filename, line in reversed(stack):
+            key = (parent, function, filename, line)
+            frame_id = self._frames.get(key)
+            if frame_id is None:
+                frame_id = self._frames[key] = len(self._frames) + 1
+                frame = {'name': f"{function} ({filename}:{line})", 'category': filename}
+                if parent is not None:
+                    frame['parent'] = str(parent)
+                self._new_frames.append((frame_id, frame))
+            parent = frame_id
+        return parent
+
+    def _sample_threads(self, now):
+        frames = sys._current_frames()
+        for thread in threading.enumerate():
+            frame = frames.get(thread.ident)
+            if frame is None or not _is_sampled(thread):
+                continue
+            stack = _frame_stack(frame)
+            if stack[0][:2] in IDLE_FRAMES:
+                continue
+            self._thread_names[thread.ident] = thread.name
+            self._samples.append({
+                'cpu': 0, 'tid': thread.ident, 'ts': self._us(now), 'name': 'sample',
+                'sf': str(self._stack_id(stack)), 'weight': 1,
+            })
+
+    def _sample(self):
+        last_write = time.monotonic()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            now = time.monotonic()
+            if self._recorded < MAX_EVENTS:
+                self._sample_threads(now)
+            if now - last_write > WRITE_INTERVAL:
+                self._append_spool()
+                last_write = now
+        self._append_spool()
+
+    def _append_spool(self):
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        samples, self._samples = self._samples, []
+        frames, self._new_frames = self._new_frames, []
+        try:
+            with open(self._spool('events'), 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(event) + '\n' for event in events)
+            with open(self._spool('samples'), 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(sample) + '\n' for sample in samples)
+            with open(self._spool('frames'), 'a', encoding='utf-8') as f:
+                f.writelines(f'"{frame_id}":{json.dumps(frame)}\n' for frame_id, frame in frames)
+        except OSError as e:
+            logging.error(f"Unable to append to the trace spool {self.spool_dir}: {e}")
+        recorded = self._recorded + len(events) + len(samples)
+        if recorded >= MAX_EVENTS > self._recorded:
+            logging.warning(f"{MAX_EVENTS} trace events recorded, recording stopped")
+        self._recorded = recorded
+
+    def write(self):
+        """Assemble the trace file from the spool, line by line"""
+        pid = os.getpid()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        names.update(self._thread_names)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as out:
+                out.write('{"displayTimeUnit":"ms","traceEvents":[')
+                out.write(','.join(
+                    json.dumps({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+                    for tid, name in names.items()
+                ))
+                # There is always a thread name before the spans
+                _copy_lines(out, self._spool('events'), first=False)
+                out.write('],"stackFrames":{')
+                _copy_lines(out, self._spool('frames'))
+                out.write('},"samples":[')
+                _copy_lines(out, self._spool('samples'))
+                out.write(']}')
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Unable to write trace file {self.path}: {e}")
+            return
+        logging.info(f"Trace written to {self.path}")
+
+
+tracer = Tracer()
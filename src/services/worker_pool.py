@@ -0,0 +1,309 @@
+"""Multi-process server for headless Linux hosts.
+
+    python main.py --headless --workers 4
+
+Every worker process runs its own ServerController on the same port with
+SO_REUSEPORT, so the kernel spreads the connections over the cores. The
+game state lives in a separate state process reached over a Unix socket
+through multiprocessing.managers: a shared dict, and a broadcast channel
+delivering every published message to all the workers, so websocket
+broadcasts reach the players connected to any of them.
+
+kahiin opts in with a hook on kahiin.app:
+
+    use_shared_state(shared)  shared.state is the shared dict, whose top
+                              level keys must be assigned to propagate,
+                              shared.update(key, fn, default) atomically
+                              stores fn(current value) and returns it,
+                              shared.lock guards longer read-modify-writes,
+                              shared.publish(channel, message) broadcasts
+                              and shared.subscribe(callback) has
+                              callback(channel, message) called in this
+                              worker for every broadcast
+
+Scores and answers change on several workers at once, so they must go
+through update() or be changed under the lock, or updates get lost. fn runs
+in the state process, it must be a module level function. The hook belongs
+to the kahiin submodule; without it the server runs in a single process.
+"""
+import importlib
+import logging
+import multiprocessing
+import os
+import queue
+import secrets
+import signal
+import socket
+import sys
+import threading
+import time
+from multiprocessing.managers import AcquirerProxy, BaseManager, DictProxy
+
+from src.services.logging_config import setup_logging
+from src.services.server_controller import DRAIN_TIMEOUT, ServerController, bind_free_port
+from src.services.settings_store import app_settings
+from src.services.signal_handler import setup_signal_handlers
+
+STATE_SOCKET = os.path.join('.cache', 'kahiin-state.sock')
+# Messages handed to a worker per round trip to the state process
+RECEIVE_BATCH = 100
+RESPAWN_MIN_DELAY = 1
+RESPAWN_MAX_DELAY = 30
+# Seconds a worker must stay up for its respawn delay to start over
+RESPAWN_RESET = 120
+# Seconds given to the workers to drain on stop, on top of their own timeout
+STOP_GRACE = 3
+
+
+class Broadcaster:
+    """Lives in the state process, fans messages out to one queue per worker"""
+
+    def __init__(self):
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def register(self, worker):
+        with self._lock:
+            # A respawned worker starts with an empty queue
+            self._queues[worker] = queue.Queue()
+
+    def publish(self, channel, message):
+        with self._lock:
+            queues = list(self._queues.values())
+        for q in queues:
+            q.put((channel, message))
+
+    def receive(self, worker, timeout):
+        q = self._queues[worker]
+        try:
+            messages = [q.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(messages) < RECEIVE_BATCH:
+            try:
+                messages.append(q.get_nowait())
+            except queue.Empty:
+                break
+        return messages
+
+
+class StateUpdater:
+    """Lives in the state process, applies read-modify-writes under the state lock"""
+
+    def __init__(self, state, lock):
+        self._state = state
+        self._lock = lock
+
+    def update(self, key, fn, default=None):
+        with self._lock:
+            value = fn(self._state.get(key, default))
+            self._state[key] = value
+            return value
+
+
+_state = {}
+_state_lock = threading.RLock()
+_updater = StateUpdater(_state, _state_lock)
+_broadcaster = Broadcaster()
+
+
+def _get_state():
+    return _state
+
+
+def _get_lock():
+    return _state_lock
+
+
+def _get_updater():
+    return _updater
+
+
+def _get_broadcaster():
+    return _broadcaster
+
+
+class StateManager(BaseManager):
+    pass
+
+
+StateManager.register('get_state', callable=_get_state, proxytype=DictProxy)
+StateManager.register('get_lock', callable=_get_lock, proxytype=AcquirerProxy)
+StateManager.register('get_updater', callable=_get_updater)
+StateManager.register('get_broadcaster', callable=_get_broadcaster)
+
+
+def _ignore_signals():
+    # Ctrl+C and systemd signal the whole process group, the state must
+    # outlive the workers' drain and is shut down by the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+class SharedState:
+    """Worker side of the state process, handed to kahiin"""
+
+    def __init__(self, manager, worker):
+        self.state = manager.get_state()
+        self.lock = manager.get_lock()
+        self._updater = manager.get_updater()
+        self._broadcaster = manager.get_broadcaster()
+        self._broadcaster.register(worker)
+        self._worker = worker
+        self._listeners = []
+
+    def update(self, key, fn, default=None):
+        """Store fn(value of key) in the state process, atomically, and return it"""
+        return self._updater.update(key, fn, default)
+
+    def publish(self, channel, message):
+        self._broadcaster.publish(channel, message)
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+        if len(self._listeners) == 1:
+            threading.Thread(target=self._receive, name='kahiin-broadcast', daemon=True).start()
+
+    def _receive(self):
+        while True:
+            try:
+                messages = self._broadcaster.receive(self._worker, 1.0)
+            except (EOFError, OSError):
+                # The state process is gone, the pool is stopping
+                return
+            for channel, message in messages:
+                for callback in self._listeners:
+                    try:
+                        callback(channel, message)
+                    except Exception:
+                        logging.exception(f"Broadcast on {channel} failed")
+
+
+def supports_workers():
+    """Whether this platform and kahiin allow more than one worker process"""
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        logging.warning("SO_REUSEPORT is not available, running a single server process")
+        return False
+    kahiin_app = importlib.import_module('kahiin.app')
+    if not hasattr(kahiin_app, 'use_shared_state'):
+        logging.warning("kahiin.app has no use_shared_state hook, running a single server process")
+        return False
+    return True
+
+
+def _worker_main(index, host, port, address, authkey):
+    setup_logging(log_file=f"app_log.worker{index}.txt")
+    manager = StateManager(address=address, authkey=authkey)
+    manager.connect()
+    importlib.import_module('kahiin.app').use_shared_state(SharedState(manager, index))
+
+    controller = ServerController.from_settings(app_settings())
+    controller.host = host
+    controller.configured_port = port
+    controller.reuse_port = True
+    # The state process holds the session, not the workers
+    controller.use_journal = False
+    setup_signal_handlers(controller.stop)
+    controller.start()
+    logging.info(f"Worker {index} serving on {host}:{port} (pid {os.getpid()})")
+    while controller.running:
+        time.sleep(1)
+    # Only reached if the server died, the pool starts a new worker
+    sys.exit(1)
+
+
+class WorkerPool:
+    def __init__(self, host, port, workers):
+        self.host = host
+        self.configured_port = port
+        self.port = port
+        self.workers = workers
+        self._context = multiprocessing.get_context('spawn')
+        self._processes = {}
+        # Per worker: start time, next respawn delay and planned respawn time
+        self._started = {}
+        self._delays = {}
+        self._respawn_at = {}
+        self._stopping = threading.Event()
+        self._manager = None
+        self._state = None
+        self._reserved = None
+        self._authkey = secrets.token_bytes(32)
+
+    def start(self):
+        os.makedirs(os.path.dirname(STATE_SOCKET), exist_ok=True)
+        if os.path.exists(STATE_SOCKET):
+            # Left by a pool that was killed
+            os.remove(STATE_SOCKET)
+        self._manager = StateManager(address=STATE_SOCKET, authkey=self._authkey, ctx=self._context)
+        self._manager.start(initializer=_ignore_signals)
+        self._state = self._manager.get_state()
+        # Bound without listening, it holds the port for the workers and gets no connections
+        self._reserved = bind_free_port(self.host, self.configured_port, reuse_port=True)
+        self.port = self._reserved.getsockname()[1]
+        for index in range(self.workers):
+            self._spawn(index)
+        logging.info(f"{self.workers} server workers on {self.host}:{self.port}")
+
+    def _spawn(self, index):
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.host, self.port, STATE_SOCKET, self._authkey),
+            name=f"kahiin-worker-{index}",
+        )
+        process.start()
+        self._processes[index] = process
+        self._started[index] = time.monotonic()
+
+    def _state_alive(self):
+        try:
+            len(self._state)
+        except (EOFError, OSError):
+            return False
+        return True
+
+    def watch(self):
+        """Start a new worker for every one that died, until stop().
+
+        Returns False if the state process died, the game state is then lost
+        and the pool has to be stopped.
+        """
+        while not self._stopping.wait(1):
+            if not self._state_alive():
+                logging.error("Shared state process died")
+                return False
+            now = time.monotonic()
+            for index, process in list(self._processes.items()):
+                if process.is_alive():
+                    if now - self._started[index] > RESPAWN_RESET:
+                        self._delays.pop(index, None)
+                elif index not in self._respawn_at:
+                    # Each worker waits for its own delay, the others are respawned meanwhile
+                    delay = self._delays.get(index, RESPAWN_MIN_DELAY)
+                    logging.error(f"Worker {index} exited with code {process.exitcode}, restarting it in {delay}s")
+                    self._respawn_at[index] = now + delay
+                    self._delays[index] = min(delay * 2, RESPAWN_MAX_DELAY)
+                elif now >= self._respawn_at[index]:
+                    del self._respawn_at[index]
+                    self._spawn(index)
+        return True
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + (timeout or DRAIN_TIMEOUT + STOP_GRACE)
+        for process in self._processes.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                logging.warning(f"Worker {process.name} did not stop, killing it")
+                process.kill()
+        if self._reserved is not None:
+            self._reserved.close()
+            self._reserved = None
+        if self._manager is not None:
+            self._state = None
+            self._manager.shutdown()
+            self._manager = None
+        logging.info("Server workers stopped")
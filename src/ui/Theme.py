@@ -0,0 +1,65 @@
+from kivy.metrics import dp
+from kivy.utils import get_color_from_hex
+from kivymd.uix.card import MDCard
+from kivymd.uix.label import MDLabel
+from kivymd.uix.textfield import MDTextField
+from kivymd.uix.toolbar import MDTopAppBar
+
+from src.ui.SafeButton import SafeButton
+from src.utils.Fonts import icon_font
+
+FONT_NAME = 'Bagnard'
+
+# Modern color palette with dark gray instead of purple
+COLORS = {
+    'primary': get_color_from_hex("#333333"),  # Dark gray instead of purple
+    'primary_dark': get_color_from_hex("#212121"),  # Very dark gray
+    'accent': get_color_from_hex("#5D5D5D"),  # Medium gray
+    'background': get_color_from_hex("#FFFFFF"),
+    'card': get_color_from_hex("#F5F5F5"),
+    'text': get_color_from_hex("#333333"),
+    'success': get_color_from_hex("#4CAF50"),
+    'warning': get_color_from_hex("#FFC107"),
+    'error': get_color_from_hex("#F44336"),
+    'info': get_color_from_hex("#2196F3"),
+}
+
+# Widgets are created with the app font and style directly, so that no
+# walk over the tree and no second text render are needed afterwards.
+
+def themed_label(**kwargs):
+    kwargs.setdefault('font_name', FONT_NAME)
+    return MDLabel(**kwargs)
+
+def themed_card(**kwargs):
+    kwargs.setdefault('orientation', 'vertical')
+    kwargs.setdefault('elevation', 0)
+    kwargs.setdefault('radius', dp(5))
+    return MDCard(**kwargs)
+
+def themed_button(text, on_press, md_bg_color, disabled=False, height=dp(50), **kwargs):
+    kwargs.setdefault('font_name', FONT_NAME)
+    return SafeButton(
+        text=text,
+        on_press=on_press,
+        md_bg_color=md_bg_color,
+        size_hint_y=None,
+        height=height,
+        font_size=dp(16),
+        disabled=disabled,
+        elevation=0,
+        **kwargs
+    )
+
+def themed_text_field(**kwargs):
+    kwargs.setdefault('font_name', FONT_NAME)
+    return MDTextField(**kwargs)
+
+def themed_toolbar(**kwargs):
+    toolbar = MDTopAppBar(**kwargs)
+    toolbar.ids.label_title.font_name = FONT_NAME
+    return toolbar
+
+def icon_markup(glyph, size):
+    """Markup drawing an md_icons glyph with a font that has it"""
+    return f"[size={size}px][font={icon_font(glyph)}]{glyph}[/font][/size]"
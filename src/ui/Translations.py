@@ -0,0 +1,32 @@
+import weakref
+
+
+class TranslationRegistry:
+    """Keeps track of which widget property displays which glossary key.
+
+    A language switch then only has to rewrite the registered properties
+    instead of rebuilding the interface.
+    """
+
+    def __init__(self, glossary):
+        self.glossary = glossary
+        self._bindings = {}
+
+    def bind(self, widget, prop, key, formatter=None):
+        """Bind widget.prop to a glossary key and set its current text"""
+        self._bindings[(id(widget), prop)] = (weakref.ref(widget), prop, key, formatter)
+        self._apply(widget, prop, key, formatter)
+        return widget
+
+    def set_glossary(self, glossary):
+        self.glossary = glossary
+        for binding_id, (ref, prop, key, formatter) in list(self._bindings.items()):
+            widget = ref()
+            if widget is None:
+                del self._bindings[binding_id]
+                continue
+            self._apply(widget, prop, key, formatter)
+
+    def _apply(self, widget, prop, key, formatter):
+        text = self.glossary[key]
+        setattr(widget, prop, formatter(text) if formatter else text)
@@ -0,0 +1,178 @@
+"""Subset fonts for the APK.
+
+The build step scans the code for the md_icons glyphs it uses and the
+glossary for the characters it displays, and writes subset copies of the
+icon and text fonts with the code points they cover:
+
+    python -m src.utils.Fonts
+
+register_fonts() registers the subsets when they are fresh and cover what
+is displayed, and the full fonts otherwise. Icons missing from the subset
+are drawn with the icon font bundled with KivyMD, which uses the same code
+points, so the full MaterialDesignIcons.ttf is left out of the APK.
+"""
+import glob
+import json
+import logging
+import os
+import re
+
+from src.utils.Glossary import GLOSSARY_PATH
+
+ICON_FONT = 'MaterialIcons'
+# Registered by KivyMD itself
+ICON_FALLBACK_FONT = 'Icons'
+TEXT_FONT = 'Bagnard'
+FONTS = {
+    ICON_FONT: 'src/MaterialDesignIcons.ttf',
+    TEXT_FONT: 'kahiin/web/static/font/Bagnard.otf',
+}
+SUBSET_DIR = 'font_subsets'
+MANIFEST_FILE = 'fonts.json'
+CODE_GLOBS = ('main.py', 'src/**/*.py')
+ICON_PATTERN = re.compile(r"""md_icons\[['"]([\w-]+)['"]\]""")
+# Printable ASCII, Latin-1 and Latin Extended-A, so typed text keeps the font
+BASE_CHARACTERS = set(range(0x20, 0x7F)) | set(range(0xA0, 0x180))
+
+_subsets = None
+
+
+def _used_icon_names():
+    names = set()
+    for pattern in CODE_GLOBS:
+        for path in glob.glob(pattern, recursive=True):
+            with open(path, 'r', encoding='utf-8') as f:
+                names.update(ICON_PATTERN.findall(f.read()))
+    return names
+
+
+def _glossary_characters(source=GLOSSARY_PATH):
+    with open(source, 'r', encoding='utf-8') as f:
+        glossaries = json.load(f)
+    return {ord(c) for glossary in glossaries.values() for text in glossary.values() for c in str(text)}
+
+
+def _displayed_characters(glossary):
+    return {ord(c) for text in glossary.values() for c in str(text) if c.isprintable()}
+
+
+def _code_characters():
+    """Non-ASCII characters written in the code, like the language names"""
+    characters = set()
+    for pattern in CODE_GLOBS:
+        for path in glob.glob(pattern, recursive=True):
+            with open(path, 'r', encoding='utf-8') as f:
+                characters.update(ord(c) for c in f.read() if ord(c) > 0x7F)
+    return characters
+
+
+def _write_subset(source, target, codepoints=None, glyph_names=None):
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    options = subset.Options()
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    font = TTFont(source)
+    cmap = font.getBestCmap()
+    if glyph_names is not None:
+        by_name = {name: codepoint for codepoint, name in cmap.items()}
+        missing = glyph_names - set(by_name)
+        if missing:
+            logging.warning(f"Icons not found in {source}: {', '.join(sorted(missing))}")
+        codepoints = {by_name[name] for name in glyph_names if name in by_name}
+    covered = sorted(set(codepoints) & set(cmap))
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=covered)
+    subsetter.subset(font)
+    font.save(target)
+    return covered
+
+
+def _subset_path(name, source, subset_dir=SUBSET_DIR):
+    return os.path.join(subset_dir, f"{name}{os.path.splitext(source)[1]}")
+
+
+def compile_fonts(subset_dir=SUBSET_DIR):
+    os.makedirs(subset_dir, exist_ok=True)
+    requested = {
+        ICON_FONT: {'glyph_names': _used_icon_names()},
+        TEXT_FONT: {'codepoints': BASE_CHARACTERS | _glossary_characters() | _code_characters()},
+    }
+    manifest = {}
+    for name, source in FONTS.items():
+        if not os.path.exists(source):
+            logging.warning(f"Font {source} not found, {name} is not subset")
+            continue
+        target = _subset_path(name, source, subset_dir)
+        covered = _write_subset(source, target, **requested[name])
+        manifest[name] = {'file': target, 'codepoints': covered}
+        if 'codepoints' in requested[name]:
+            # Characters the full font lacks do not make the subset stale
+            manifest[name]['requested'] = sorted(requested[name]['codepoints'])
+    with open(os.path.join(subset_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def _subset_is_fresh(path, source):
+    if 'ANDROID_ARGUMENT' in os.environ:
+        # Both come from the same APK, and extraction does not keep mtimes
+        return os.path.exists(path)
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source)
+    except OSError:
+        # No full font shipped next to the subset
+        return os.path.exists(path)
+
+
+def load_subsets(subset_dir=SUBSET_DIR):
+    """Return {font name: (subset file, code points)} for the fresh subsets"""
+    global _subsets
+    if _subsets is None:
+        _subsets = {}
+        try:
+            with open(os.path.join(subset_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        for name, entry in manifest.items():
+            if _subset_is_fresh(entry['file'], FONTS[name]):
+                _subsets[name] = (entry['file'], frozenset(entry.get('requested', entry['codepoints'])))
+    return _subsets
+
+
+def register_fonts(glossary):
+    """Register the app fonts with Kivy, preferring the subsets"""
+    from kivy.core.text import LabelBase
+
+    subsets = load_subsets()
+    text_subset = subsets.get(TEXT_FONT)
+    if text_subset and not _displayed_characters(glossary) <= text_subset[1]:
+        logging.info(f"{TEXT_FONT} subset misses characters of the glossary, using the full font")
+        text_subset = None
+    icon_subset = subsets.get(ICON_FONT)
+    if icon_subset:
+        icon_path = icon_subset[0]
+    elif os.path.exists(FONTS[ICON_FONT]):
+        icon_path = FONTS[ICON_FONT]
+    else:
+        from kivymd import fonts_path
+        icon_path = os.path.join(fonts_path, 'materialdesignicons-webfont.ttf')
+    LabelBase.register(name=TEXT_FONT, fn_regular=text_subset[0] if text_subset else FONTS[TEXT_FONT])
+    LabelBase.register(name=ICON_FONT, fn_regular=icon_path)
+
+
+def icon_font(glyph):
+    """Name of the registered font able to draw an md_icons glyph"""
+    icon_subset = load_subsets().get(ICON_FONT)
+    if icon_subset is None or ord(glyph) in icon_subset[1]:
+        return ICON_FONT
+    return ICON_FALLBACK_FONT
+
+
+if __name__ == '__main__':
+    manifest = compile_fonts()
+    for name, entry in manifest.items():
+        size = os.path.getsize(entry['file'])
+        print(f"{name}: {len(entry['codepoints'])} glyphs, {size // 1024} KiB in {entry['file']}")
@@ -0,0 +1,77 @@
+"""Per-language glossary bundles.
+
+The build step splits glossary.json into one marshal file per language,
+already merged with the fallback language, so that the app only has to
+load the language it displays:
+
+    python -m src.utils.Glossary
+"""
+import json
+import logging
+import marshal
+import os
+import threading
+
+GLOSSARY_PATH = 'glossary.json'
+BUNDLE_DIR = 'glossary'
+FALLBACK_LANGUAGE = 'en'
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _bundle_path(language, bundle_dir=BUNDLE_DIR):
+    return os.path.join(bundle_dir, f"{language}.marshal")
+
+
+def _with_fallback(glossaries, language):
+    """Fill the keys missing in a language from the fallback language"""
+    merged = dict(glossaries.get(FALLBACK_LANGUAGE, {}))
+    merged.update(glossaries[language])
+    return merged
+
+
+def compile_glossary(source=GLOSSARY_PATH, bundle_dir=BUNDLE_DIR):
+    with open(source, 'r', encoding='utf-8') as f:
+        glossaries = json.load(f)
+    os.makedirs(bundle_dir, exist_ok=True)
+    for language in glossaries:
+        with open(_bundle_path(language, bundle_dir), 'wb') as f:
+            marshal.dump(_with_fallback(glossaries, language), f)
+    return sorted(glossaries)
+
+
+def _bundle_is_fresh(path):
+    if 'ANDROID_ARGUMENT' in os.environ:
+        # Both come from the same APK, and extraction does not keep mtimes
+        return os.path.exists(path)
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(GLOSSARY_PATH)
+    except OSError:
+        # No source glossary shipped next to the bundle
+        return os.path.exists(path)
+
+
+def _load(language):
+    path = _bundle_path(language)
+    if _bundle_is_fresh(path):
+        try:
+            with open(path, 'rb') as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            logging.warning(f"Unreadable glossary bundle {path}: {e}")
+    with open(GLOSSARY_PATH, 'r', encoding='utf-8') as f:
+        return _with_fallback(json.load(f), language)
+
+
+def load_glossary(language):
+    """Return the glossary of a language, loading it on first use"""
+    with _cache_lock:
+        if language not in _cache:
+            _cache[language] = _load(language)
+        return _cache[language]
+
+
+if __name__ == '__main__':
+    languages = compile_glossary()
+    print(f"Glossary compiled for {', '.join(languages)} in {BUNDLE_DIR}/")
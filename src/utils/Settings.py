@@ -1,14 +1,13 @@
-import json
-import os
+from src.utils.Glossary import load_glossary
+from src.services.settings_store import app_settings, kahiin_settings
 
 def get_app_settings():
-    with open('settings.json', 'r') as f:
-        return json.load(f)
+    return app_settings().snapshot()
 
 def get_kahiin_settings():
-    with open(os.path.join('kahiin', 'settings.json'), 'r') as f:
-        return json.load(f)
+    return kahiin_settings().snapshot()
 
-def get_app_glossary():
-    with open('glossary.json', 'r') as f:
-        return json.load(f)[get_app_settings().get('language')]
\ No newline at end of file
+def get_app_glossary(language=None):
+    if language is None:
+        language = app_settings().get('language')
+    return load_glossary(language)
@@ -25,4 +25,4 @@ fi
 
 git submodule update --remote --merge
 source venv/bin/activate
-python main.py
\ No newline at end of file
+python main.py "$@"
\ No newline at end of file